@@ -1,7 +1,8 @@
 import streamlit as st
 from globals import get_user_plan
-from auth import verify_token, create_token
+from auth import create_token
 from globals import set_auth_cookie, log_session
+from page_gate import require_access
 
 
 # ===== Page config + favicon =====
@@ -56,17 +57,13 @@ st.markdown("""
 
 
 # ===== Logo + Title =====
-def _logo_b64(path="optra_logo_transparent.png", width=72):
-   from PIL import Image; from io import BytesIO; import base64
-   img = Image.open(path); img = img.resize((width, width), Image.Resampling.LANCZOS)
-   buf = BytesIO(); img.save(buf, format="PNG")
-   return base64.b64encode(buf.getvalue()).decode()
+from assets import logo_b64
 
 
 st.markdown(
    f"""
    <div class='optra-header'>
-       <img src='data:image/png;base64,{_logo_b64()}' width='72'/>
+       <img src='data:image/png;base64,{logo_b64(72)}' width='72'/>
        <h1 style='margin:0; font-size:1.9rem; color:white;'>OPTRA</h1>
    </div>
    """,
@@ -113,7 +110,7 @@ def _auto_clear_login():
 if unlock_clicked:
    _auto_clear_login()
    with st.spinner("Checking your access…"):
-       plan = get_user_plan(email)
+       plan = get_user_plan(email, force_refresh=True)
 
 
    st.markdown("<div style='height:14px'></div>", unsafe_allow_html=True)
@@ -128,7 +125,7 @@ if unlock_clicked:
 
        # set token in URL (optional)
        try:
-           st.query_params["token"] = create_token(norm_email)
+           st.query_params["token"] = create_token(norm_email, plan)
        except Exception:
            pass
 
@@ -153,14 +150,8 @@ if unlock_clicked:
 
 
 # ===== Access Gate =====
-decoded = verify_token()
-email_from_token = (decoded or {}).get("email")
-plan_from_token = get_user_plan(email_from_token) if email_from_token else None
-if not decoded or plan_from_token not in ("Starter Plan", "Pro Plan"):
-   st.stop()
-st.session_state["user_email"] = email_from_token
-st.session_state["user_plan"]  = plan_from_token
-st.session_state["unlocked"]   = True
+# Resolved once per session (see page_gate.py); without access, stop below the login UI
+require_access(on_denied="stop", theme=False)
 
 
 # === Your Original Imports (DO NOT DELETE) ===
@@ -179,15 +170,16 @@ from bs4 import BeautifulSoup
 from dotenv import load_dotenv
 from feedback import get_past_good_answers, show_feedback_ui
 from globals import *
+import hashlib
+from ingest_jobs import submit_document, document_status
+from vector_store import get_pinecone_context
 
 
 # ----------------------------
 # Load and embed OPTRA logo
 # ----------------------------
 import streamlit as st
-from PIL import Image
-from io import BytesIO
-import base64
+from assets import LOGO_PATH, logo_b64
 
 
 
@@ -195,73 +187,19 @@ import base64
 # Favicon and layout config (MUST come first)
 st.set_page_config(
   page_title="Smart Grant Advisor",
-  page_icon=Image.open("optra_logo_transparent.png"),
+  page_icon=LOGO_PATH,
   layout="wide"
 )
 
 
 
 
-# Your existing OPTRA logo banner (no changes needed)
-def get_logo_base64(path, width=80):
-  img = Image.open(path)
-  img = img.resize((width, width), Image.Resampling.LANCZOS)
-  buffer = BytesIO()
-  img.save(buffer, format="PNG")
-  return base64.b64encode(buffer.getvalue()).decode()
-
-
-
-
-logo_base64 = get_logo_base64("optra_logo_transparent.png")
-
-
-import streamlit as st
-import base64
-from PIL import Image
-from io import BytesIO
-import os
-
-
-
-
-def get_logo_base64(path, size=32):
-  img = Image.open(path)
-  img = img.resize((size, size), Image.Resampling.LANCZOS)
-  buffer = BytesIO()
-  img.save(buffer, format="PNG")
-  return base64.b64encode(buffer.getvalue()).decode()
-
-
-
-
-import streamlit as st
-import base64
-from PIL import Image
-from io import BytesIO
-
-
-
-
-def get_logo_base64(path="optra_logo_transparent.png", size=32):
-  try:
-      img = Image.open(path)
-      img = img.resize((size, size), Image.Resampling.LANCZOS)
-      buffer = BytesIO()
-      img.save(buffer, format="PNG")
-      return base64.b64encode(buffer.getvalue()).decode()
-  except Exception as e:
-      return None
-
-
-
-
 def set_favicon():
-  logo_base64 = get_logo_base64()
-  if logo_base64:
+  favicon_b64 = logo_b64(32)
+  if favicon_b64:
       st.markdown(
           f"""
-          <link rel="icon" type="image/png" href="data:image/png;base64,{logo_base64}">
+          <link rel="icon" type="image/png" href="data:image/png;base64,{favicon_b64}">
           """,
           unsafe_allow_html=True
       )
@@ -613,12 +551,23 @@ if st.button("Check Eligibility"):
 
 
 
-          # ✅ Retrieve relevant context from Pinecone
-          pinecone_context = get_pinecone_context(
-              user_id="test_user",  # TODO: Replace with Supabase-authenticated user ID
-              query=f"{industry} {goal} {digital_adoption}",
-              top_k=5
-          )
+          # ✅ Retrieve relevant context from Pinecone (one batched lookup across facets)
+          # Retrieval is optional context: an unbootstrapped index or outage shouldn't block the assessment
+          try:
+              pinecone_context = get_pinecone_context(
+                  user_id=st.session_state.get("user_email"),  # the gated principal; None = public corpus only
+                  queries=[
+                      f"{industry} {goal} {digital_adoption}",
+                      f"{industry} industry grants",
+                      goal,
+                      f"digital adoption: {digital_adoption}",
+                      additional_goal,
+                  ],
+                  top_k=5
+              )
+          except Exception as e:
+              print(f"[eligibility] retrieval failed, continuing without context: {e}")
+              pinecone_context = ""
 
 
 
@@ -749,9 +698,33 @@ auto_data = {}
 
 
 
+INGEST_POLL_SECONDS = 2
+
+
+def show_ingest_status(user_id, file_hash, polling):
+  ingest_status = document_status(user_id, file_hash)
+  if polling and ingest_status["state"] != "running":
+      st.rerun()  # full rerun: stops polling and shows the retry button if it failed
+  if ingest_status["state"] == "running":
+      st.info("⏳ Saving document to Pinecone in the background…")
+  elif ingest_status["state"] == "done":
+      st.info("📌 Document saved to Pinecone for future context and search.")
+  elif ingest_status["state"] == "failed":
+      st.warning(f"Could not store document in Pinecone: {ingest_status['error']}")
+
+
+
+
 if uploaded_file:
   try:
-      all_text = extract_text_from_pdf(uploaded_file)
+      # Extract + index once per distinct file; reruns reuse the cached text and the existing job
+      file_bytes = uploaded_file.getvalue()
+      file_hash = hashlib.sha256(file_bytes).hexdigest()
+      upload_state = st.session_state.get("uploaded_doc")
+      if not upload_state or upload_state["hash"] != file_hash:
+          upload_state = {"hash": file_hash, "text": extract_text_from_pdf(BytesIO(file_bytes))}
+          st.session_state["uploaded_doc"] = upload_state
+      all_text = upload_state["text"]
       doc_summary = all_text[:2000]
       auto_data = extract_data_from_text(all_text)
       st.success("Document uploaded and analyzed.")
@@ -760,16 +733,32 @@ if uploaded_file:
 
 
 
-      # === Store in Pinecone immediately ===
+      # === Store in Pinecone (background, once per document per user) ===
       try:
-          user_id = "test_user"  # TODO: Replace with actual logged-in user ID from Supabase
-          add_document(
-              text=all_text,
-              doc_id_prefix=f"userdoc_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}",
-              metadata={"type": "grant_doc", "source": "upload"},
-              user_id=user_id
+          # Per-user namespace (user_<email>): doc_key re-uploads replace only this user's chunks
+          user_id = st.session_state.get("user_email")
+          if not user_id:
+              raise RuntimeError("no signed-in user to store it under")
+          ingest_status = document_status(user_id, file_hash)
+          if ingest_status["state"] in ("missing", "failed"):
+              retry = ingest_status["state"] == "failed" and st.button("Retry saving to Pinecone")
+              if ingest_status["state"] == "missing" or retry:
+                  submit_document(
+                      user_id=user_id,
+                      content_hash=file_hash,
+                      text=all_text,
+                      doc_id_prefix=f"userdoc_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}",
+                      metadata={"type": "grant_doc", "source": "upload", "file_name": uploaded_file.name},
+                      doc_key=f"userdoc_{uploaded_file.name}",
+                      retry_failed=True,
+                  )
+                  ingest_status = document_status(user_id, file_hash)
+
+          # Poll while the job runs so the status updates without waiting for the next interaction
+          polling = ingest_status["state"] == "running"
+          st.fragment(show_ingest_status, run_every=INGEST_POLL_SECONDS if polling else None)(
+              user_id, file_hash, polling
           )
-          st.info("📌 Document saved to Pinecone for future context and search.")
       except Exception as e:
           st.warning(f"Could not store document in Pinecone: {e}")
 
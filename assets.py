@@ -0,0 +1,137 @@
+# assets.py
+import base64
+import hashlib
+import json
+import os
+import threading
+from io import BytesIO
+from typing import Optional
+
+import streamlit as st
+
+
+# ==========================================================
+# ✅ Settings
+# ==========================================================
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+LOGO_PATH = "optra_logo_transparent.png"
+STATIC_DIR = os.path.join(APP_DIR, "static")            # written by `python assets.py`
+MANIFEST_PATH = os.path.join(STATIC_DIR, "assets.json")
+
+# (width, keep_aspect) for every logo the app renders: page headers (80), Home header (72),
+# favicon (32), Newsfeed header (80, aspect-preserving). Anything else is rendered once on first use.
+LOGO_SIZES = ((80, False), (72, False), (32, False), (80, True))
+
+THEME_CSS = """
+<style>
+  html, body, [data-testid="stAppViewContainer"] {
+      background: linear-gradient(to bottom, #0a0a0a 0%, #0a0a0a 10%, #0d0f1c 30%, #0f111f 60%, #00011d 100%) !important;
+      color: #ffffff !important;
+  }
+  section[data-testid="stSidebar"] { background-color: #000 !important; }
+  section[data-testid="stSidebar"] * { color: #fff !important; }
+</style>
+"""
+
+
+def _logo_file(path: str = LOGO_PATH) -> str:
+    # Pages are run with the repo root as cwd; fall back to this file's directory otherwise
+    return path if os.path.exists(path) else os.path.join(APP_DIR, path)
+
+
+def _logo_key(width: int, keep_aspect: bool) -> str:
+    return f"{width}{'a' if keep_aspect else ''}"
+
+
+def _render_logo_png(source: bytes, width: int, keep_aspect: bool) -> bytes:
+    from PIL import Image  # only needed when no prebuilt manifest matches
+
+    img = Image.open(BytesIO(source))
+    height = int(img.size[1] * (width / float(img.size[0]))) if keep_aspect else width
+    img = img.resize((width, height), Image.Resampling.LANCZOS)
+    buffer = BytesIO()
+    img.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+# ==========================================================
+# ✅ Process-wide bundle (prebuilt manifest, else rendered once)
+# ==========================================================
+class AssetBundle:
+    def __init__(self, source: Optional[bytes], logos: dict):
+        self._source = source
+        self._logos = logos  # key -> base64 PNG
+        self._lock = threading.Lock()
+
+    def logo(self, width: int, keep_aspect: bool) -> Optional[str]:
+        key = _logo_key(width, keep_aspect)
+        cached = self._logos.get(key)
+        if cached is not None or self._source is None:
+            return cached
+        with self._lock:
+            if key not in self._logos:
+                png = _render_logo_png(self._source, width, keep_aspect)
+                self._logos[key] = base64.b64encode(png).decode()
+            return self._logos[key]
+
+
+def _load_manifest(source_sha: str) -> dict:
+    try:
+        with open(MANIFEST_PATH, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    # A manifest built from a different logo is ignored rather than served stale
+    return manifest.get("logos", {}) if manifest.get("source_sha256") == source_sha else {}
+
+
+@st.cache_resource(show_spinner=False)
+def get_asset_bundle() -> AssetBundle:
+    try:
+        with open(_logo_file(), "rb") as f:
+            source = f.read()
+    except OSError as e:
+        print(f"[assets] logo unavailable: {e}")
+        return AssetBundle(None, {})
+    logos = _load_manifest(hashlib.sha256(source).hexdigest())
+    bundle = AssetBundle(source, dict(logos))
+    for width, keep_aspect in LOGO_SIZES:
+        bundle.logo(width, keep_aspect)
+    return bundle
+
+
+def logo_b64(width: int = 80, keep_aspect: bool = False) -> Optional[str]:
+    """Base64 PNG of the OPTRA logo at `width` px (square unless keep_aspect); None if the file is missing."""
+    return get_asset_bundle().logo(width, keep_aspect)
+
+
+# ==========================================================
+# ✅ Build step: static files + manifest
+# ==========================================================
+def build_static_assets(out_dir: str = STATIC_DIR) -> dict:
+    """
+    Render every LOGO_SIZES entry to <out_dir>/logo_<key>.png, write theme.css and an
+    assets.json manifest that get_asset_bundle() loads instead of touching PIL.
+    With `[server] enableStaticServing = true` the files are also served under app/static/.
+    """
+    with open(_logo_file(), "rb") as f:
+        source = f.read()
+    os.makedirs(out_dir, exist_ok=True)
+    logos = {}
+    for width, keep_aspect in LOGO_SIZES:
+        key = _logo_key(width, keep_aspect)
+        png = _render_logo_png(source, width, keep_aspect)
+        with open(os.path.join(out_dir, f"logo_{key}.png"), "wb") as f:
+            f.write(png)
+        logos[key] = base64.b64encode(png).decode()
+    with open(os.path.join(out_dir, "theme.css"), "w", encoding="utf-8") as f:
+        f.write(THEME_CSS.replace("<style>", "").replace("</style>", "").strip() + "\n")
+    manifest = {"source_sha256": hashlib.sha256(source).hexdigest(), "logos": logos}
+    with open(os.path.join(out_dir, "assets.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+    return manifest
+
+
+if __name__ == "__main__":
+    built = build_static_assets()
+    print(f"Wrote {len(built['logos'])} logo sizes + theme.css to {STATIC_DIR}")
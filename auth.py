@@ -1,15 +1,16 @@
 # auth.py
 import streamlit as st
-from supabase import create_client, Client
 from jose import jwt
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
+import threading
+import time
+from typing import Optional
 
 # ==========================================================
-# ✅ Supabase client (Service Role key)
+# ✅ Supabase client (shared, Service Role key)
 # ==========================================================
-SUPABASE_URL = st.secrets["SUPABASE"]["URL"]
-SUPABASE_SERVICE_ROLE_KEY = st.secrets["SUPABASE"]["SERVICE_ROLE_KEY"]
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY)
+from supabase_client import get_supabase
+from globals import invalidate_user_plan
 
 # ==========================================================
 # ✅ JWT config (from nested secrets)
@@ -18,22 +19,190 @@ JWT_SECRET = st.secrets["SUPABASE"]["JWT_SECRET"]
 JWT_ALGORITHM = "HS256"
 JWT_LIFETIME_HOURS = 12  # adjust if you want longer/shorter sessions
 
+# ==========================================================
+# ✅ Revocation / plan-version list (sql/002_plan_versions.sql)
+# ==========================================================
+# A token is honoured only while its plan version ("pv") is current for the email and it
+# was issued after the email's revoked_before. The list is small, kept in memory and
+# refreshed by a background thread, so checking a token never touches the network.
+REVOCATION_TABLE = "plan_versions"
+REVOCATION_REFRESH_SECONDS = 60
+REVOCATION_PAGE_SIZE = 1000
+
+
+def _epoch(value) -> float:
+    if not value:
+        return 0.0
+    try:
+        return datetime.fromisoformat(str(value).replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return 0.0
+
+
+class RevocationList:
+    def __init__(self, refresh_seconds: float = REVOCATION_REFRESH_SECONDS):
+        self.refresh_seconds = refresh_seconds
+        self.last_refresh = 0.0
+        self.last_error = None
+        self._entries: dict[str, tuple[int, float]] = {}  # email -> (plan_version, revoked_before)
+        self._since: Optional[str] = None
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def current(self, email: str) -> tuple[int, float]:
+        with self._lock:
+            return self._entries.get((email or "").strip().lower(), (0, 0.0))
+
+    def apply(self, email: str, plan_version: int, revoked_before: float) -> bool:
+        """Merge one row; returns True if the email's entry changed."""
+        # Both only ever move forward, so a late or stale write can't re-validate tokens
+        key = (email or "").strip().lower()
+        with self._lock:
+            old = self._entries.get(key, (0, 0.0))
+            new = (max(old[0], int(plan_version or 0)), max(old[1], revoked_before or 0.0))
+            self._entries[key] = new
+        return new != old
+
+    def fetch(self, email: str) -> tuple[int, float]:
+        """Read one email's row from the database now (bypassing the refresh interval) and apply it."""
+        key = (email or "").strip().lower()
+        rows = (
+            get_supabase().table(REVOCATION_TABLE)
+            .select("email, plan_version, revoked_before")
+            .eq("email", key)
+            .limit(1)
+            .execute()
+            .data
+        ) or []
+        if rows and self.apply(key, rows[0].get("plan_version"), _epoch(rows[0].get("revoked_before"))):
+            invalidate_user_plan(key)
+        return self.current(key)
+
+    def refresh(self):
+        """
+        Pull rows changed since the last refresh (everything on the first call).
+        Pages are walked with a (updated_at, email) keyset rather than offsets, so rows
+        sharing a timestamp at a page boundary are neither skipped nor double-counted.
+        """
+        cursor: Optional[tuple[str, str]] = None
+        while True:
+            query = get_supabase().table(REVOCATION_TABLE).select("email, plan_version, revoked_before, updated_at")
+            if cursor:
+                ts, email = (v.replace('"', '\\"') for v in cursor)
+                query = query.or_(f'updated_at.gt."{ts}",and(updated_at.eq."{ts}",email.gt."{email}")')
+            elif self._since:
+                # gte: rows stamped in the same instant as the last refresh's newest row are re-read
+                query = query.gte("updated_at", self._since)
+            rows = query.order("updated_at").order("email").limit(REVOCATION_PAGE_SIZE).execute().data or []
+            for row in rows:
+                changed = self.apply(row.get("email"), row.get("plan_version"), _epoch(row.get("revoked_before")))
+                if changed and self.last_refresh:
+                    # A plan change (webhook, trigger) anywhere: drop this process's cached plan too,
+                    # or the page gate's get_user_plan fallback would serve the old one
+                    invalidate_user_plan(row.get("email"))
+            if rows:
+                cursor = (rows[-1].get("updated_at") or "", rows[-1].get("email") or "")
+            if len(rows) < REVOCATION_PAGE_SIZE:
+                break
+        if cursor and cursor[0]:
+            self._since = cursor[0]
+        self.last_refresh = time.time()
+
+    def refresh_quietly(self):
+        try:
+            self.refresh()
+            self.last_error = None
+        except Exception as e:
+            # Missing table / network blip: keep serving the last list and try again later
+            if str(e) != str(self.last_error):
+                print(f"[auth] revocation list refresh failed: {e}")
+            self.last_error = e
+
+    def _run(self):
+        while True:
+            time.sleep(self.refresh_seconds)
+            self.refresh_quietly()
+
+    def start(self):
+        """Load the list once (one query per process), then keep it fresh in the background."""
+        if self._thread is None:
+            self.refresh_quietly()
+            self._thread = threading.Thread(target=self._run, name="optra-revocations", daemon=True)
+            self._thread.start()
+        return self
+
+
+@st.cache_resource(show_spinner=False)
+def get_revocation_list() -> RevocationList:
+    return RevocationList().start()
+
 # ==========================================================
 # ✅ Token helpers
 # ==========================================================
-def create_token(email: str) -> str:
-    """Create a signed JWT for the given email with an expiry."""
+def create_token(email: str, plan: Optional[str] = None) -> str:
+    """
+    Create a signed JWT for the given email with an expiry.
+    With a plan, the token is a self-contained principal: it carries the plan and the
+    email's current plan version (read from plan_versions, not the refreshed list), so
+    page gates can authorize without a lookup.
+    """
+    now = datetime.now(timezone.utc)
     payload = {
         "email": email,
-        "exp": datetime.utcnow() + timedelta(hours=JWT_LIFETIME_HOURS),
-        "iat": datetime.utcnow(),
+        "exp": now + timedelta(hours=JWT_LIFETIME_HOURS),
+        "iat": now,
     }
+    if plan:
+        payload["plan"] = plan
+        revocations = get_revocation_list()
+        try:
+            # One read at login: a subscription made seconds ago has already bumped the version
+            version = revocations.fetch(email)[0]
+        except Exception as e:
+            print(f"[auth] plan version lookup failed, using the cached list: {e}")
+            version = revocations.current(email)[0]
+        payload["pv"] = version
     return jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALGORITHM)
 
+def is_token_current(decoded: dict) -> bool:
+    """In-memory check against the revocation / plan-version list (no network)."""
+    version, revoked_before = get_revocation_list().current(decoded.get("email"))
+    if int(decoded.get("pv", 0)) < version:
+        return False
+    return not revoked_before or float(decoded.get("iat", 0)) >= revoked_before
+
+def revoke_sessions(email: str, bump_plan_version: bool = True):
+    """
+    Invalidate every token issued to `email` so far (plan change, logout everywhere).
+    The plan version is incremented on the server (plan_versions_bump in
+    sql/002_plan_versions.sql), so a concurrent trigger bump is never overwritten; the
+    row written is applied locally at once and other processes pick it up on their next
+    refresh (within REVOCATION_REFRESH_SECONDS).
+    """
+    email_norm = (email or "").strip().lower()
+    if not email_norm:
+        return
+    if bump_plan_version:
+        get_supabase().rpc("plan_versions_bump", {"p_email": email_norm}).execute()
+    # Second granularity to match the token's iat; tokens issued in this second are revoked too
+    revoked_before = float(int(time.time()) + 1)
+    # plan_version is left out so the upsert keeps the server's value (0 for a new row)
+    res = get_supabase().table(REVOCATION_TABLE).upsert({
+        "email": email_norm,
+        "revoked_before": datetime.fromtimestamp(revoked_before, timezone.utc).isoformat(),
+    }, on_conflict="email").execute()
+    row = (getattr(res, "data", None) or [{}])[0]
+    revocations = get_revocation_list()
+    revocations.apply(email_norm, row.get("plan_version") or 0, revoked_before)
+    invalidate_user_plan(email_norm)
+    if "plan_version" not in row:
+        revocations.fetch(email_norm)  # the upsert didn't return the row (minimal response)
+
 def verify_token():
     """
     Read the 'token' from the URL query params via st.query_params
-    and return the decoded payload, or None if invalid/expired/missing.
+    and return the decoded payload, or None if invalid/expired/revoked/missing.
+    Tokens from create_token(email, plan) carry "plan", so callers can skip get_user_plan.
     """
     params = st.query_params
     token = params.get("token")
@@ -47,6 +216,9 @@ def verify_token():
 
     try:
         decoded = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
+        if not is_token_current(decoded):
+            # Revoked, or the plan changed since the token was issued
+            return None
         return decoded
     except jwt.ExpiredSignatureError:
         st.error("Your session has expired. Please log in again.")
@@ -69,7 +241,7 @@ def get_user_plan(email: str):
         email_norm = email.strip().lower()
 
         resp = (
-            supabase.table("subscriptions")
+            get_supabase().table("subscriptions")
             .select("email, plan")
             .ilike("email", email_norm)  # case-insensitive match
             .limit(1)
@@ -92,7 +264,7 @@ def is_registered_email(email: str) -> bool:
             return False
         email_norm = email.strip().lower()
         resp = (
-            supabase.table("subscriptions")
+            get_supabase().table("subscriptions")
             .select("email")
             .ilike("email", email_norm)
             .limit(1)
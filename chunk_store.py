@@ -0,0 +1,143 @@
+# chunk_store.py
+"""
+Local store for chunk text, keyed by vector ID.
+
+Vectors only carry metadata, so the text that goes into prompts is kept here:
+an append-only data file holds the UTF-8 bytes and a small SQLite table maps
+(namespace, id) -> (offset, length, metadata). Reads go through one shared
+mmap of the data file, so get_views() hands out memoryview slices without
+copying; get_texts() decodes them in bulk.
+"""
+import json
+import mmap
+import os
+import sqlite3
+import threading
+from typing import Iterable, Iterator, Optional
+
+
+class ChunkStore:
+    def __init__(self, directory: str):
+        os.makedirs(directory, exist_ok=True)
+        self.data_path = os.path.join(directory, "chunks.dat")
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(os.path.join(directory, "chunks.sqlite"), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS chunks (
+                namespace TEXT NOT NULL,
+                id TEXT NOT NULL,
+                offset INTEGER NOT NULL,
+                length INTEGER NOT NULL,
+                metadata TEXT,
+                PRIMARY KEY (namespace, id)
+            )
+            """
+        )
+        self._conn.commit()
+        self._data = open(self.data_path, "a+b")
+        self._map: Optional[mmap.mmap] = None
+        self._map_size = 0
+
+    # ---------- writes ----------
+    def put_many(self, namespace: str, items: Iterable[tuple[str, str, Optional[dict]]]):
+        """Append (id, text, metadata) items; an existing id is repointed to the new bytes."""
+        with self._lock:
+            self._data.seek(0, os.SEEK_END)
+            offset = self._data.tell()
+            rows = []
+            for vid, text, metadata in items:
+                raw = (text or "").encode("utf-8")
+                self._data.write(raw)
+                rows.append((namespace, vid, offset, len(raw), json.dumps(metadata, default=str) if metadata else None))
+                offset += len(raw)
+            self._data.flush()
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO chunks (namespace, id, offset, length, metadata) VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._conn.commit()
+
+    def delete(self, namespace: str, ids: Optional[Iterable[str]] = None):
+        """Forget ids (or the whole namespace). Bytes stay in the data file until compact()."""
+        with self._lock:
+            if ids is None:
+                self._conn.execute("DELETE FROM chunks WHERE namespace = ?", (namespace,))
+            else:
+                self._conn.executemany(
+                    "DELETE FROM chunks WHERE namespace = ? AND id = ?", [(namespace, vid) for vid in ids]
+                )
+            self._conn.commit()
+
+    # ---------- reads ----------
+    def _rows(self, namespace: str, ids: list[str]) -> dict[str, tuple[int, int]]:
+        found = {}
+        for i in range(0, len(ids), 500):
+            part = ids[i:i + 500]
+            for vid, offset, length in self._conn.execute(
+                f"SELECT id, offset, length FROM chunks WHERE namespace = ? AND id IN ({','.join('?' * len(part))})",
+                [namespace, *part],
+            ):
+                found[vid] = (offset, length)
+        return found
+
+    def _mapped(self) -> Optional[mmap.mmap]:
+        size = os.path.getsize(self.data_path)
+        if size == 0:
+            return None
+        if self._map is None or size > self._map_size:
+            # Old views stay valid: the previous map is left for the GC once nothing references it
+            self._map = mmap.mmap(self._data.fileno(), 0, access=mmap.ACCESS_READ)
+            self._map_size = size
+        return self._map
+
+    def get_views(self, ids: list[str], namespace: str) -> dict[str, memoryview]:
+        """Zero-copy memoryviews of the stored UTF-8 bytes for each known id."""
+        with self._lock:
+            rows = self._rows(namespace, list(ids))
+            mapped = self._mapped() if rows else None
+            if mapped is None:
+                return {}
+            view = memoryview(mapped)
+            return {vid: view[offset:offset + length] for vid, (offset, length) in rows.items()}
+
+    def get_texts(self, ids: list[str], namespace: str) -> dict[str, str]:
+        return {vid: str(mv, "utf-8") for vid, mv in self.get_views(ids, namespace).items()}
+
+    def missing(self, ids: list[str], namespace: str) -> list[str]:
+        with self._lock:
+            known = self._rows(namespace, list(ids))
+        return [vid for vid in ids if vid not in known]
+
+    def items(self, namespace: str) -> Iterator[tuple[str, str, Optional[dict]]]:
+        """Yield (id, text, metadata) for every chunk in a namespace."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, offset, length, metadata FROM chunks WHERE namespace = ? ORDER BY offset", (namespace,)
+            ).fetchall()
+            mapped = self._mapped() if rows else None
+        for vid, offset, length, metadata in rows:
+            yield vid, mapped[offset:offset + length].decode("utf-8"), json.loads(metadata) if metadata else None
+
+    # ---------- maintenance ----------
+    def compact(self):
+        """Rewrite the data file with only live chunks, reclaiming space from overwrites and deletes."""
+        with self._lock:
+            rows = self._conn.execute("SELECT namespace, id, offset, length FROM chunks ORDER BY offset").fetchall()
+            mapped = self._mapped()
+            tmp_path = self.data_path + ".tmp"
+            updates = []
+            with open(tmp_path, "wb") as out:
+                pos = 0
+                for namespace, vid, offset, length in rows:
+                    out.write(mapped[offset:offset + length])
+                    updates.append((pos, namespace, vid))
+                    pos += length
+            self._map = None
+            self._map_size = 0
+            self._data.close()
+            os.replace(tmp_path, self.data_path)
+            self._data = open(self.data_path, "a+b")
+            self._conn.executemany("UPDATE chunks SET offset = ? WHERE namespace = ? AND id = ?", updates)
+            self._conn.commit()
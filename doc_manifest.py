@@ -0,0 +1,96 @@
+# doc_manifest.py
+"""
+Per-document manifests of chunk IDs, so re-ingesting a revised document only
+embeds new or changed chunks and deletes the ones that disappeared.
+
+Chunk IDs are derived from content: "<doc_key>_<sha256(chunk)[:16]>", with an
+occurrence suffix when the same chunk text repeats inside one document. This only
+pays off with content-defined chunk boundaries (vector_store.chunk_text); fixed token
+windows would shift every later chunk on any insert.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+
+def chunk_ids_for(doc_key: str, chunks: list[str]) -> list[str]:
+    seen: dict[str, int] = {}
+    ids = []
+    for chunk in chunks:
+        digest = hashlib.sha256(chunk.encode("utf-8")).hexdigest()[:16]
+        n = seen.get(digest, 0)
+        seen[digest] = n + 1
+        ids.append(f"{doc_key}_{digest}" if n == 0 else f"{doc_key}_{digest}_{n}")
+    return ids
+
+
+class ManifestStore:
+    """SQLite table of (namespace, doc_key) -> {chunk_id: chunk_index} plus the metadata last written."""
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS manifests (
+                namespace TEXT NOT NULL,
+                doc_key TEXT NOT NULL,
+                chunks TEXT NOT NULL,
+                metadata TEXT,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (namespace, doc_key)
+            )
+            """
+        )
+        self._conn.commit()
+
+    def get(self, namespace: str, doc_key: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT chunks, metadata FROM manifests WHERE namespace = ? AND doc_key = ?",
+                (namespace, doc_key),
+            ).fetchone()
+        if not row:
+            return None
+        return {"chunks": json.loads(row[0]), "metadata": json.loads(row[1]) if row[1] else None}
+
+    def put(self, namespace: str, doc_key: str, chunks: dict, metadata: Optional[dict]):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO manifests (namespace, doc_key, chunks, metadata, updated_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (namespace, doc_key, json.dumps(chunks), json.dumps(metadata, default=str), time.time()),
+            )
+            self._conn.commit()
+
+    def delete(self, namespace: str, doc_key: Optional[str] = None):
+        """Forget one document, or every document in the namespace when doc_key is None."""
+        with self._lock:
+            if doc_key is None:
+                self._conn.execute("DELETE FROM manifests WHERE namespace = ?", (namespace,))
+            else:
+                self._conn.execute(
+                    "DELETE FROM manifests WHERE namespace = ? AND doc_key = ?", (namespace, doc_key)
+                )
+            self._conn.commit()
+
+    def doc_keys(self, namespace: str) -> list[str]:
+        with self._lock:
+            rows = self._conn.execute("SELECT doc_key FROM manifests WHERE namespace = ?", (namespace,)).fetchall()
+        return [r[0] for r in rows]
+
+    def signature(self, namespace: str) -> tuple:
+        """Cheap change marker for a namespace's manifests: (count, latest write, sum of write times)."""
+        with self._lock:
+            return tuple(self._conn.execute(
+                "SELECT COUNT(*), MAX(updated_at), SUM(updated_at) FROM manifests WHERE namespace = ?",
+                (namespace,),
+            ).fetchone())
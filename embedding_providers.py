@@ -0,0 +1,167 @@
+# embedding_providers.py
+import math
+import re
+import zlib
+from abc import ABC, abstractmethod
+from typing import Callable, Optional
+
+import numpy as np
+
+
+# ==========================================================
+# ✅ Provider interface
+# ==========================================================
+class EmbeddingProvider(ABC):
+    """
+    Turns a batch of texts into vectors of a fixed dimension.
+
+    `name` identifies the vector space: it keys the embedding cache and picks the
+    index, so two providers may only share a name if their vectors are interchangeable.
+    `cacheable` is False for providers that are cheaper to recompute than to look up.
+    """
+
+    name: str = ""
+    dimension: int = 0
+    cacheable: bool = True
+
+    @abstractmethod
+    def embed(self, texts: list[str]) -> list[list[float]]:
+        """One vector of length `dimension` per text, in order."""
+
+
+# ==========================================================
+# ✅ OpenAI (hosted, one request per batch)
+# ==========================================================
+class OpenAIEmbeddings(EmbeddingProvider):
+    def __init__(self, client_factory: Callable, model: str, dimension: int, native_dimension: int):
+        self._client_factory = client_factory
+        self.model = model
+        self.dimension = dimension
+        self._native = dimension == native_dimension
+        # Keeps the pre-provider cache keys valid: "<model>" or "<model>@<dim>"
+        self.name = model if self._native else f"{model}@{dimension}"
+
+    def embed(self, texts: list[str]) -> list[list[float]]:
+        extra = {} if self._native else {"dimensions": self.dimension}
+        response = self._client_factory().embeddings.create(model=self.model, input=texts, **extra)
+        return [item.embedding for item in sorted(response.data, key=lambda d: d.index)]
+
+
+# ==========================================================
+# ✅ Hashing vectorizer (CPU, no model, no dependencies beyond numpy)
+# ==========================================================
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:[&'.][a-z0-9]+)*")
+
+
+class HashingEmbeddings(EmbeddingProvider):
+    """
+    Signed feature hashing of word unigrams and bigrams with sublinear term frequency,
+    L2-normalised. A lexical baseline: microseconds per text, but no notion of synonyms.
+    """
+
+    cacheable = False
+
+    def __init__(self, dimension: int = 1024, bigrams: bool = True):
+        self.dimension = dimension
+        self.bigrams = bigrams
+        self.name = f"hashing-v1{'-bi' if bigrams else ''}@{dimension}"
+
+    def _features(self, text: str) -> dict[int, float]:
+        tokens = _TOKEN_RE.findall((text or "").lower())
+        terms = tokens + ([f"{a} {b}" for a, b in zip(tokens, tokens[1:])] if self.bigrams else [])
+        counts: dict[int, float] = {}
+        for term in terms:
+            # crc32 is stable across processes, unlike hash(); the top bit picks the sign
+            h = zlib.crc32(term.encode("utf-8"))
+            slot = h % self.dimension
+            counts[slot] = counts.get(slot, 0.0) + (1.0 if h & 0x80000000 else -1.0)
+        return counts
+
+    def embed(self, texts: list[str]) -> list[list[float]]:
+        out = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for slot, value in self._features(text).items():
+                out[row, slot] = math.copysign(1.0 + math.log(abs(value)), value) if value else 0.0
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return (out / norms).tolist()
+
+
+# ==========================================================
+# ✅ sentence-transformers (CPU model, torch or ONNX runtime)
+# ==========================================================
+class SentenceTransformerEmbeddings(EmbeddingProvider):
+    """
+    Local transformer model, e.g. all-MiniLM-L6-v2 (384d). Needs `sentence-transformers`
+    (plus `optimum[onnxruntime]` for backend="onnx"), which are not in requirements.txt.
+    """
+
+    def __init__(self, model: str = "sentence-transformers/all-MiniLM-L6-v2", backend: str = "torch",
+                 threads: Optional[int] = None, batch_size: int = 64):
+        try:
+            from sentence_transformers import SentenceTransformer
+        except ImportError as e:
+            raise RuntimeError(
+                "The sentence-transformers embedding provider needs `pip install sentence-transformers`"
+            ) from e
+        model_kwargs = {}
+        if threads:
+            if backend == "onnx":
+                import onnxruntime
+                options = onnxruntime.SessionOptions()
+                options.intra_op_num_threads = threads
+                model_kwargs["session_options"] = options
+            else:
+                import torch
+                torch.set_num_threads(threads)
+        extra = {"backend": backend} if backend != "torch" else {}
+        if model_kwargs:
+            extra["model_kwargs"] = model_kwargs
+        self._model = SentenceTransformer(model, device="cpu", **extra)
+        self.batch_size = batch_size
+        self.dimension = self._model.get_sentence_embedding_dimension()
+        self.name = f"st:{model.split('/')[-1]}@{self.dimension}"
+
+    def embed(self, texts: list[str]) -> list[list[float]]:
+        vectors = self._model.encode(
+            texts, batch_size=self.batch_size, normalize_embeddings=True, convert_to_numpy=True
+        )
+        return vectors.astype(np.float32).tolist()
+
+
+# ==========================================================
+# ✅ Factory
+# ==========================================================
+PROVIDERS = ("openai", "hashing", "sentence-transformers")
+
+
+def normalize_spec(spec) -> dict:
+    """Accept "hashing" or {"provider": "hashing", "dim": 512, ...}; returns a plain dict."""
+    if isinstance(spec, str):
+        spec = {"provider": spec}
+    spec = {str(k): v for k, v in dict(spec).items()}
+    spec["provider"] = str(spec.get("provider", "openai")).lower()
+    if spec["provider"] not in PROVIDERS:
+        raise ValueError(f"Unknown embedding provider {spec['provider']!r}; expected one of {PROVIDERS}")
+    return spec
+
+
+def make_provider(spec: dict, openai_client_factory: Callable, openai_model: str,
+                  native_dimension: int) -> EmbeddingProvider:
+    spec = normalize_spec(spec)
+    kind = spec["provider"]
+    if kind == "openai":
+        return OpenAIEmbeddings(
+            openai_client_factory,
+            spec.get("model", openai_model),
+            int(spec.get("dim", native_dimension)),
+            native_dimension,
+        )
+    if kind == "hashing":
+        return HashingEmbeddings(int(spec.get("dim", 1024)), bool(spec.get("bigrams", True)))
+    return SentenceTransformerEmbeddings(
+        spec.get("model", "sentence-transformers/all-MiniLM-L6-v2"),
+        backend=spec.get("backend", "torch"),
+        threads=int(spec["threads"]) if spec.get("threads") else None,
+        batch_size=int(spec.get("batch_size", 64)),
+    )
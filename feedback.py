@@ -1,11 +1,8 @@
 import streamlit as st
-from supabase import create_client, Client
 from datetime import datetime as dt, timezone
 from globals import *
 
-SUPABASE_URL = st.secrets["SUPABASE_URL"]
-SUPABASE_KEY = st.secrets["SUPABASE_SERVICE_ROLE_KEY"]  # ✅ Use service role key for R/W access
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+from supabase_client import get_supabase  # ✅ shared service-role client (R/W access)
 
 TABLE_NAME = "feedback"
 
@@ -18,7 +15,7 @@ def get_past_good_answers(context_tag: str, limit: int = 3):
     """
     try:
         result = (
-            supabase.table(TABLE_NAME)
+            get_supabase().table(TABLE_NAME)
             .select("output, rating, context_tag")
             .eq("context_tag", context_tag)
             .eq("rating", "good")
@@ -40,7 +37,7 @@ def get_past_good_answers(context_tag: str, limit: int = 3):
 # ==========================================================
 def save_feedback(page_name: str, context_tag: str, query: str, ai_output: str, rating: str):
     try:
-        supabase.table(TABLE_NAME).insert({
+        get_supabase().table(TABLE_NAME).insert({
             "page_name": page_name,
             "context_tag": context_tag,
             "query": query,
@@ -1,14 +1,15 @@
 # globals.py
 import streamlit as st
-from supabase import create_client, Client
 from datetime import datetime as dt, timezone, timedelta
-from PIL import Image
-from io import BytesIO
-import base64
 import json
 import re
+import time
 from typing import Optional
 
+from ttl_cache import TTLCache
+from write_buffer import WriteBehindBuffer
+from assets import THEME_CSS, logo_b64
+
 
 # NEW: for token hashing / JWT
 import hashlib
@@ -16,11 +17,9 @@ import jwt
 
 
 # ==========================================================
-# ✅ Supabase Client Setup (Service Role Key)
+# ✅ Supabase Client (shared, pooled; see supabase_client.py)
 # ==========================================================
-SUPABASE_URL = st.secrets["SUPABASE"]["URL"]
-SUPABASE_SERVICE_ROLE_KEY = st.secrets["SUPABASE"]["SERVICE_ROLE_KEY"]
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY)
+from supabase_client import get_supabase, supabase_latency_stats
 
 
 # Debug toggle
@@ -47,6 +46,11 @@ SUBS_SECRETS = st.secrets.get("SUPABASE_SUBSCRIPTIONS", {})
 EMAIL_FIELD_OVERRIDE: Optional[str] = SUBS_SECRETS.get("EMAIL_FIELD")
 PLAN_FIELD_OVERRIDE: Optional[str]  = SUBS_SECRETS.get("PLAN_FIELD")
 STATUS_FIELD_OVERRIDE: Optional[str]= SUBS_SECRETS.get("STATUS_FIELD")
+# Single-query lookup (see sql/001_subscription_lookup.sql); set LOOKUP_RPC = "" to skip the RPC
+SUBS_LOOKUP_RPC: Optional[str]      = SUBS_SECRETS.get("LOOKUP_RPC", "subscriptions_for_email")
+NORMALIZED_EMAIL_FIELD: Optional[str] = SUBS_SECRETS.get("NORMALIZED_EMAIL_FIELD")  # e.g. "email_normalized"
+_lookup_rpc_available = True
+_missing_email_columns: set[str] = set()  # email columns subscriptions turned out not to have
 
 
 # ==========================================================
@@ -61,7 +65,7 @@ def get_current_user_id():
 # ==========================================================
 def add_document(text, doc_id_prefix, metadata, user_id):
    try:
-       supabase.table("documents").insert({
+       get_supabase().table("documents").insert({
            "doc_id": f"{doc_id_prefix}",
            "user_id": user_id,
            "content": text,
@@ -72,22 +76,6 @@ def add_document(text, doc_id_prefix, metadata, user_id):
        _dbg_ui(f"Error saving document: {e}")
 
 
-# ==========================================================
-# ✅ Save User Interaction to Supabase
-# ==========================================================
-def save_user_interaction(interaction_type, content=None, metadata=None):
-   try:
-       supabase.table("interactions").insert({
-           "user_id": get_current_user_id(),
-           "interaction_type": interaction_type,
-           "content": content,
-           "metadata": json.dumps(metadata) if metadata else None,
-           "created_at": dt.now(timezone.utc).isoformat()
-       }).execute()
-   except Exception as e:
-       _dbg_ui(f"Error saving user interaction: {e}")
-
-
 # ==========================================================
 # ✅ Time Helpers
 # ==========================================================
@@ -166,10 +154,36 @@ def _pick_latest(rows: list[dict]) -> Optional[dict]:
 # ==========================================================
 # ✅ Session Logger  (compatible with your sessions schema)
 # ==========================================================
+SESSION_LOG_DEDUPE_SECONDS = 6 * 3600  # one row per (email, token_hash) per window
+SESSION_LOG_BATCH_SIZE     = 50
+SESSION_LOG_FLUSH_SECONDS  = 5.0
+
+
 def _sha256(s: str) -> str:
    return hashlib.sha256(s.encode("utf-8")).hexdigest()
 
 
+def _insert_rows(table: str, rows: list[dict]):
+   """Multi-row insert; rows are grouped by column set so each request has a uniform shape."""
+   groups: dict[tuple, list[dict]] = {}
+   for row in rows:
+       groups.setdefault(tuple(sorted(row)), []).append(row)
+   for group in groups.values():
+       res = get_supabase().table(table).insert(group).execute()
+       _dbg_console(f"{table} insert result:", len(getattr(res, "data", None) or []), "rows")
+
+
+@st.cache_resource(show_spinner=False)
+def _get_session_log_buffer() -> WriteBehindBuffer:
+   return WriteBehindBuffer(
+       lambda rows: _insert_rows("sessions", rows),
+       batch_size=SESSION_LOG_BATCH_SIZE,
+       flush_interval=SESSION_LOG_FLUSH_SECONDS,
+       dedupe_seconds=SESSION_LOG_DEDUPE_SECONDS,
+       name="optra-session-log",
+   )
+
+
 def log_session(
    email: str,
    plan_or_token: Optional[str] = None,
@@ -180,10 +194,15 @@ def log_session(
    device_fingerprint: Optional[str] = None,
 ):
    """
-   Inserts into Supabase 'sessions' with columns:
+   Queues a row for Supabase 'sessions' with columns:
      email, token_hash, ip_address, device_fingerprint, expires_at, created_at(default now()).
 
 
+   Idempotent per (email, token_hash) within SESSION_LOG_DEDUPE_SECONDS, and buffered:
+   rows are written by a background thread in batched inserts, so callers never wait on it.
+   Returns True if a row was queued, False for a duplicate.
+
+
    Backwards compatible:
      - Old usage: log_session(email, plan)  -> stores just email (created_at via DB).
      - New usage: log_session(email, token=token, expires_at_iso=...)  -> stores token_hash & expires_at.
@@ -209,151 +228,438 @@ def log_session(
        payload = {k: v for k, v in payload.items() if v is not None}
 
 
-       res = supabase.table("sessions").insert(payload).execute()
-       # Always print once while wiring this up
-       print("sessions insert result:", getattr(res, "data", None), getattr(res, "error", None))
+       return _get_session_log_buffer().add(payload, key=(payload["email"], token_hash))
    except Exception as e:
-       print("Session log insert error:", e)
+       print("Session log queue error:", e)
+       return False
 
 
 # ==========================================================
-# ✅ Main plan lookup (unchanged behaviour; keeps auto-log for compatibility)
+# ✅ Save User Interaction to Supabase (write-behind)
 # ==========================================================
-def get_user_plan(email: str) -> Optional[str]:
+INTERACTION_DEDUPE_SECONDS = 24 * 3600  # the same (user, type, content) is recorded once a day
+INTERACTION_BATCH_SIZE     = 100
+INTERACTION_FLUSH_SECONDS  = 5.0
+INTERACTION_MAX_PENDING    = 2000       # memory bound; oldest rows are dropped beyond this
+
+
+@st.cache_resource(show_spinner=False)
+def _get_interaction_buffer() -> WriteBehindBuffer:
+   return WriteBehindBuffer(
+       lambda rows: _insert_rows("interactions", rows),
+       batch_size=INTERACTION_BATCH_SIZE,
+       flush_interval=INTERACTION_FLUSH_SECONDS,
+       max_pending=INTERACTION_MAX_PENDING,
+       dedupe_seconds=INTERACTION_DEDUPE_SECONDS,
+       name="optra-interactions",
+   )
+
+
+def save_user_interaction(interaction_type, content=None, metadata=None):
+   """
+   Queue an analytics row for 'interactions'; returns without waiting on Supabase.
+   Reruns that re-save the same (user, type, content) are dropped, and a background
+   thread writes the rest in batched inserts (flushed again at shutdown).
+   """
    try:
-       if not email:
-           _dbg_ui("(debug) get_user_plan: empty email.")
-           return None
+       user_id = get_current_user_id()
+       row = {
+           "user_id": user_id,
+           "interaction_type": interaction_type,
+           "content": content,
+           "metadata": json.dumps(metadata) if metadata else None,
+           "created_at": dt.now(timezone.utc).isoformat()
+       }
+       key = (user_id, interaction_type, _sha256(content or ""))
+       return _get_interaction_buffer().add(row, key=key)
+   except Exception as e:
+       _dbg_ui(f"Error saving user interaction: {e}")
+       return False
+
 
+# ==========================================================
+# ✅ Plan cache (per session + process-wide, with TTL)
+# ==========================================================
+PLAN_CACHE_TTL_SECONDS          = 300  # an active plan is re-checked at most every 5 minutes
+PLAN_CACHE_NEGATIVE_TTL_SECONDS = 30   # "no plan" expires fast so new subscribers get in quickly
+PLAN_CACHE_MAX_ENTRIES          = 10_000
+_PLAN_MISS = object()
 
-       e = _norm_email(email)
 
+@st.cache_resource(show_spinner=False)
+def _get_plan_cache() -> TTLCache:
+   return TTLCache(PLAN_CACHE_TTL_SECONDS, max_entries=PLAN_CACHE_MAX_ENTRIES)
 
-       email_columns  = [EMAIL_FIELD_OVERRIDE] if EMAIL_FIELD_OVERRIDE else []
-       email_columns += [c for c in EMAIL_COLUMNS_DEFAULT if c not in email_columns]
 
+@st.cache_resource(show_spinner=False)
+def _plan_invalidations() -> dict:
+   """{normalized email or '*': time.time() of its last invalidation}, shared by all sessions."""
+   return {}
 
-       plan_columns   = [PLAN_FIELD_OVERRIDE] if PLAN_FIELD_OVERRIDE else []
-       plan_columns  += [c for c in PLAN_COLUMNS_DEFAULT if c not in plan_columns]
 
+def _invalidated_at(e: str) -> float:
+   marks = _plan_invalidations()
+   return max(marks.get(e, 0.0), marks.get("*", 0.0))
 
-       status_columns = [STATUS_FIELD_OVERRIDE] if STATUS_FIELD_OVERRIDE else []
-       status_columns+= [c for c in STATUS_COLUMNS_DEFAULT if c not in status_columns]
 
+def _session_plan_cache() -> Optional[dict]:
+   try:
+       return st.session_state.setdefault("_plan_cache", {})
+   except Exception:
+       return None  # no session (scripts, background threads)
 
-       sub_row = None
 
+def _cached_plan(e: str, now: float):
+   session = _session_plan_cache()
+   if session is not None and e in session:
+       plan, cached_at, expires_at = session[e]
+       if now < expires_at and cached_at > _invalidated_at(e):
+           return plan
+       del session[e]
+   plan = _get_plan_cache().get(e, _PLAN_MISS)
+   if plan is not _PLAN_MISS and session is not None:
+       # The process entry's remaining TTL is unknown here, so the session copy only lives briefly
+       session[e] = (plan, now, now + PLAN_CACHE_NEGATIVE_TTL_SECONDS)
+   return plan
 
-       # 1) Direct lookup in subscriptions by email
-       for col in email_columns:
-           try:
-               res = (
-                   supabase.table("subscriptions")
-                   .select("*")
-                   .ilike(col, f"%{e}%")
-                   .limit(5)
-                   .execute()
-               )
-               rows = getattr(res, "data", None) or []
-               cand = _pick_latest(rows)
-               if cand:
-                   sub_row = cand
-                   _dbg_ui(f"(debug) subscriptions hit via {col} → id={cand.get('id')}")
-                   break
-           except Exception as qerr:
-               _dbg_ui(f"(debug) subscriptions lookup failed on '{col}': {qerr}")
-
-
-       # 2) Fallback: profiles(email) -> user_id -> subscriptions
-       if not sub_row:
-           try:
-               prof = (
-                   supabase.table("profiles")
-                   .select("id, user_id, email")
-                   .ilike("email", f"%{e}%")
-                   .limit(1)
-                   .execute()
-               )
-               prof_rows = getattr(prof, "data", None) or []
-               if prof_rows:
-                   user_id = prof_rows[0].get("user_id") or prof_rows[0].get("id")
-                   if user_id:
-                       sub = (
-                           supabase.table("subscriptions")
-                           .select("*")
-                           .eq("user_id", user_id)
-                           .limit(5)
-                           .execute()
-                       )
-                       rows = getattr(sub, "data", None) or []
-                       cand = _pick_latest(rows)
-                       if cand:
-                           sub_row = cand
-                           _dbg_ui(f"(debug) subscriptions hit via user_id={user_id} → id={cand.get('id')}")
-           except Exception as qerr:
-               _dbg_ui(f"(debug) profiles/user_id lookup failed: {qerr}")
-
-
-       if not sub_row:
-           _dbg_ui(f"(debug) No subscriptions row found for '{e}'. "
-                   f"Tried email columns {email_columns} and profiles fallback.")
-           return None
+
+def _remember_plan(e: str, plan: Optional[str], started: float):
+   if _invalidated_at(e) >= started:
+       return  # invalidated while the lookup was in flight; the result may be stale
+   ttl = PLAN_CACHE_TTL_SECONDS if plan else PLAN_CACHE_NEGATIVE_TTL_SECONDS
+   _get_plan_cache().set(e, plan, ttl_seconds=ttl)
+   session = _session_plan_cache()
+   if session is not None:
+       session[e] = (plan, started, started + ttl)
 
 
-       if any(k in sub_row for k in status_columns):
-           if not _row_status_ok(sub_row, status_columns):
-               _dbg_ui("(debug) Row found but not 'active'. "
-                       "Status fields: " + ", ".join(f"{c}={sub_row.get(c)}" for c in status_columns if c in sub_row))
-               return None
+def invalidate_user_plan(email: Optional[str] = None):
+   """
+   Forget cached plans for one email, or for everyone when email is None.
+   auth.RevocationList calls it for every email whose plan version moves (the subscriptions
+   trigger in sql/002 bumps it), so plan changes made anywhere reach every process within
+   one refresh; call it directly after in-process admin actions. Session-level copies made
+   before the call are ignored on their next read.
+   """
+   e = _norm_email(email) if email else "*"
+   if email:
+       _get_plan_cache().invalidate(e)
+   else:
+       _get_plan_cache().clear()
+   _plan_invalidations()[e] = time.time()
 
 
-       plan = _resolve_plan_from_row(sub_row, plan_columns)
+def plan_cache_stats() -> dict:
+   return _get_plan_cache().stats()
 
 
-       # Keep old behaviour: log a minimal session row when a valid plan is seen
-       if plan in ("Starter Plan", "Pro Plan"):
-           # (Backward compatible: this will just insert email/created_at)
-           log_session(e, plan)
+# ==========================================================
+# ✅ Main plan lookup (read-only)
+# ==========================================================
+def _subscription_columns() -> tuple[list[str], list[str], list[str]]:
+   email_columns  = [EMAIL_FIELD_OVERRIDE] if EMAIL_FIELD_OVERRIDE else []
+   email_columns += [c for c in EMAIL_COLUMNS_DEFAULT if c not in email_columns]
 
 
-       return plan
+   plan_columns   = [PLAN_FIELD_OVERRIDE] if PLAN_FIELD_OVERRIDE else []
+   plan_columns  += [c for c in PLAN_COLUMNS_DEFAULT if c not in plan_columns]
 
 
+   status_columns = [STATUS_FIELD_OVERRIDE] if STATUS_FIELD_OVERRIDE else []
+   status_columns+= [c for c in STATUS_COLUMNS_DEFAULT if c not in status_columns]
+   return email_columns, plan_columns, status_columns
+
+
+def _row_matches_email(row: dict, e: str, email_columns: list[str]) -> bool:
+   return any(_norm_email(row.get(c)) == e for c in email_columns if row.get(c))
+
+
+def _is_missing_rpc(err: Exception) -> bool:
+   text = str(err)
+   return "PGRST202" in text or "Could not find the function" in text
+
+
+def _missing_column(err: Exception) -> Optional[str]:
+   """Column name from a PostgREST 'column subscriptions.x does not exist' (42703) error."""
+   m = re.search(r'column (?:"?\w+"?\.)?"?(\w+)"? does not exist', str(err))
+   return m.group(1) if m else None
+
+
+# Addresses the ilike lookups accept: ilike's "%" / "*" wildcards and PostgREST's filter
+# syntax (",", "(", ")", quotes) can't appear, leaving "_" (matches one character), which
+# every lookup re-checks locally against the normalized email.
+_LOOKUP_EMAIL_RE = re.compile(r"[a-z0-9._+'-]+@[a-z0-9.-]+")
+
+
+def _is_lookup_email(e: str) -> bool:
+   return bool(_LOOKUP_EMAIL_RE.fullmatch(e))
+
+
+def _email_columns_present(email_columns: list[str]) -> list[str]:
+   return [c for c in email_columns if c not in _missing_email_columns]
+
+
+def _fetch_subscription_rows(e: str, email_columns: list[str]) -> list[dict]:
+   """
+   Subscription rows for a normalized email in one round trip:
+     - the LOOKUP_RPC function (sql/001_subscription_lookup.sql) when it is deployed;
+       it matches the indexed email_normalized columns and folds in the profiles fallback,
+     - else one subscriptions query across every email column (eq on NORMALIZED_EMAIL_FIELD
+       when configured, case-insensitive exact matches otherwise), then profiles -> user_id
+       only when that misses.
+   """
+   global _lookup_rpc_available
+   if not _is_lookup_email(e):
+       _dbg_ui(f"(debug) '{e}' is not a plain email address; not looking it up")
+       return []
+   if SUBS_LOOKUP_RPC and _lookup_rpc_available:
+       try:
+           res = get_supabase().rpc(SUBS_LOOKUP_RPC, {"p_email": e}).execute()
+           return getattr(res, "data", None) or []
+       except Exception as rpc_err:
+           if _is_missing_rpc(rpc_err):
+               _lookup_rpc_available = False  # not deployed; stop paying for the failed call
+           _dbg_ui(f"(debug) {SUBS_LOOKUP_RPC} rpc failed, using direct query: {rpc_err}")
+
+   rows = []
+   while True:
+       columns = _email_columns_present(email_columns)
+       if not NORMALIZED_EMAIL_FIELD and not columns:
+           break
+       query = get_supabase().table("subscriptions").select("*")
+       if NORMALIZED_EMAIL_FIELD:
+           query = query.eq(NORMALIZED_EMAIL_FIELD, e)
+       else:
+           query = query.or_(",".join(f"{c}.ilike.{e}" for c in columns))
+       try:
+           rows = getattr(query.limit(10).execute(), "data", None) or []
+           break
+       except Exception as qerr:
+           # One missing column fails the whole or_(): drop it for this process and retry
+           missing = _missing_column(qerr)
+           if NORMALIZED_EMAIL_FIELD or missing not in columns:
+               raise
+           _missing_email_columns.add(missing)
+           _dbg_ui(f"(debug) subscriptions has no '{missing}' column; no longer querying it")
+   # ilike treats "_" as a wildcard, so confirm the match locally
+   rows = [r for r in rows if NORMALIZED_EMAIL_FIELD or _row_matches_email(r, e, email_columns)]
+   if rows:
+       _dbg_ui(f"(debug) subscriptions hit via email → {len(rows)} row(s)")
+       return rows
+
+   query = get_supabase().table("profiles").select("id, user_id, email")
+   query = query.eq("email_normalized", e) if NORMALIZED_EMAIL_FIELD else query.ilike("email", e)
+   prof_rows = getattr(query.limit(5).execute(), "data", None) or []
+   # Same "_" wildcard caveat as above: only an exact (normalized) match may grant a plan
+   prof_rows = [r for r in prof_rows if _norm_email(r.get("email")) == e]
+   user_id = (prof_rows[0].get("user_id") or prof_rows[0].get("id")) if prof_rows else None
+   if not user_id:
+       return []
+   sub = get_supabase().table("subscriptions").select("*").eq("user_id", user_id).limit(5).execute()
+   rows = getattr(sub, "data", None) or []
+   if rows:
+       _dbg_ui(f"(debug) subscriptions hit via user_id={user_id}")
+   return rows
+
+
+def _lookup_user_plan(e: str) -> Optional[str]:
+   email_columns, plan_columns, status_columns = _subscription_columns()
+
+   # Errors propagate: get_user_plan returns None for them without caching
+   sub_row = _pick_latest(_fetch_subscription_rows(e, email_columns))
+
+   if not sub_row:
+       _dbg_ui(f"(debug) No subscriptions row found for '{e}'. "
+               f"Tried email columns {email_columns} and profiles fallback.")
+       return None
+
+
+   # Lookups don't write: sessions are logged by the login flow (log_session(email, token=...))
+   return _plan_for_row(sub_row, plan_columns, status_columns)
+
+
+def _plan_for_row(sub_row: dict, plan_columns: list[str], status_columns: list[str]) -> Optional[str]:
+   if any(k in sub_row for k in status_columns):
+       if not _row_status_ok(sub_row, status_columns):
+           _dbg_ui("(debug) Row found but not 'active'. "
+                   "Status fields: " + ", ".join(f"{c}={sub_row.get(c)}" for c in status_columns if c in sub_row))
+           return None
+   return _resolve_plan_from_row(sub_row, plan_columns)
+
+
+def get_user_plan(email: str, force_refresh: bool = False) -> Optional[str]:
+   """
+   Plan for an email, served from the session / process plan cache when possible.
+   force_refresh skips the cache (explicit login) but still refreshes it.
+   Lookup errors return None without being cached.
+   """
+   if not email:
+       _dbg_ui("(debug) get_user_plan: empty email.")
+       return None
+
+   e = _norm_email(email)
+   now = time.time()
+   if not force_refresh:
+       plan = _cached_plan(e, now)
+       if plan is not _PLAN_MISS:
+           return plan
+
+   try:
+       plan = _lookup_user_plan(e)
    except Exception as ex:
        _dbg_ui(f"(debug) get_user_plan exception: {ex}")
        return None
+   _remember_plan(e, plan, now)
+   return plan
+
+
+# ==========================================================
+# ✅ Bulk plan lookup (admin / account management)
+# ==========================================================
+BULK_LOOKUP_CHUNK_SIZE = 100   # emails (or user ids) per in_() filter; keeps URLs well under limits
+BULK_LOOKUP_PAGE_SIZE  = 1000  # PostgREST's default max-rows
+
+
+def _select_in(table: str, columns: str, column: str, values: list) -> list[dict]:
+   """All rows of `table` whose `column` is in `values`: chunked in_() filters, paged with range()."""
+   rows: list[dict] = []
+   for i in range(0, len(values), BULK_LOOKUP_CHUNK_SIZE):
+       chunk = values[i:i + BULK_LOOKUP_CHUNK_SIZE]
+       start = 0
+       while True:
+           res = (
+               get_supabase().table(table)
+               .select(columns)
+               .in_(column, chunk)
+               .order(column)
+               .order("id")  # a total order, so range() pages neither overlap nor skip rows
+               .range(start, start + BULK_LOOKUP_PAGE_SIZE - 1)
+               .execute()
+           )
+           page = getattr(res, "data", None) or []
+           rows.extend(page)
+           if len(page) < BULK_LOOKUP_PAGE_SIZE:
+               break
+           start += BULK_LOOKUP_PAGE_SIZE
+   return rows
+
+
+def _bulk_subscription_rows(emails: list[str], email_columns: list[str]) -> dict[str, list[dict]]:
+   """
+   {normalized email: subscriptions rows} for many emails. Matches NORMALIZED_EMAIL_FIELD when
+   configured; otherwise each email column is matched exactly against the normalized emails
+   (in_() has no case-insensitive form), so mixed-case stored emails need sql/001's
+   email_normalized column. Emails without a row go through profiles -> user_id, also in bulk.
+   """
+   wanted = set(emails)
+   by_email: dict[str, list[dict]] = {e: [] for e in emails}
+   seen_rows: set = set()
+
+   def _add(e: str, row: dict):
+       key = (e, row.get("id")) if row.get("id") is not None else None
+       if key is not None:
+           if key in seen_rows:
+               return  # the same row matched through more than one email column
+           seen_rows.add(key)
+       by_email[e].append(row)
+
+   lookup_columns = [NORMALIZED_EMAIL_FIELD] if NORMALIZED_EMAIL_FIELD else _email_columns_present(email_columns)
+   failures = []
+   for col in lookup_columns:
+       try:
+           rows = _select_in("subscriptions", "*", col, emails)
+       except Exception as qerr:
+           _dbg_ui(f"(debug) bulk subscriptions lookup failed on '{col}': {qerr}")
+           if not NORMALIZED_EMAIL_FIELD and _missing_column(qerr) == col:
+               _missing_email_columns.add(col)  # a column this table doesn't have; not a failure
+           else:
+               failures.append(qerr)
+           continue
+       for row in rows:
+           matched = {_norm_email(row.get(c)) for c in email_columns + lookup_columns if row.get(c)}
+           for e in matched & wanted:
+               _add(e, row)
+   if failures and len(failures) == len(lookup_columns):
+       raise failures[-1]
+
+   missing = [e for e in emails if not by_email[e]]
+   if missing:
+       email_col = "email_normalized" if NORMALIZED_EMAIL_FIELD else "email"
+       profiles = _select_in("profiles", "id, user_id, email", email_col, missing)
+       user_emails: dict = {}
+       for prof in profiles:
+           e = _norm_email(prof.get("email"))
+           user_id = prof.get("user_id") or prof.get("id")
+           if e in wanted and user_id and not by_email[e]:
+               user_emails.setdefault(user_id, set()).add(e)
+       if user_emails:
+           for row in _select_in("subscriptions", "*", "user_id", list(user_emails)):
+               for e in user_emails.get(row.get("user_id"), ()):
+                   _add(e, row)
+   return by_email
+
+
+def get_user_plans(emails, force_refresh: bool = False) -> dict[str, Optional[str]]:
+   """
+   Plans for many emails at once: {normalized email: plan or None}.
+   Cached plans are served as in get_user_plan; the rest are resolved with a few chunked
+   in_() queries on subscriptions and profiles instead of several round trips per email,
+   and written back to the plan cache. If the bulk queries fail, the uncached emails
+   come back as None and nothing is cached for them.
+   in_() is case-sensitive, so without NORMALIZED_EMAIL_FIELD an email the bulk queries
+   miss may still be stored in mixed case: those are re-checked with the single lookup
+   rather than cached as "no plan".
+   """
+   normalized = list(dict.fromkeys(e for e in map(_norm_email, emails or []) if e))
+   now = time.time()
+   plans: dict[str, Optional[str]] = {}
+   pending = []
+   for e in normalized:
+       plan = _PLAN_MISS if force_refresh else _cached_plan(e, now)
+       if plan is _PLAN_MISS:
+           pending.append(e)
+       else:
+           plans[e] = plan
+   if not pending:
+       return plans
+
+   email_columns, plan_columns, status_columns = _subscription_columns()
+   try:
+       rows_by_email = _bulk_subscription_rows(pending, email_columns)
+   except Exception as ex:
+       _dbg_ui(f"(debug) get_user_plans exception: {ex}")
+       plans.update({e: None for e in pending})
+       return plans
+
+   for e in pending:
+       rows = rows_by_email.get(e) or []
+       if rows:
+           plan = _plan_for_row(_pick_latest(rows), plan_columns, status_columns)
+       elif NORMALIZED_EMAIL_FIELD:
+           plan = None  # the normalized column makes the bulk miss authoritative
+       else:
+           try:
+               plan = _lookup_user_plan(e)
+           except Exception as ex:
+               _dbg_ui(f"(debug) get_user_plans lookup for '{e}' failed: {ex}")
+               plans[e] = None
+               continue
+       _remember_plan(e, plan, now)
+       plans[e] = plan
+   return plans
 
 
 # ==========================================================
 # ✅ Locked Page UI
 # ==========================================================
 def get_logo_base64(path="optra_logo_transparent.png", width=80):
-   try:
-       img = Image.open(path)
-       img = img.resize((width, width), Image.Resampling.LANCZOS)
-       buffer = BytesIO()
-       img.save(buffer, format="PNG")
-       return base64.b64encode(buffer.getvalue()).decode()
-   except Exception:
-       return None
+   # Served from the process-wide asset bundle (assets.py); `path` is kept for older callers
+   return logo_b64(width)
 
 
 def show_locked_page(message="🔒 This page is locked. Please log in from the Home page."):
    st.set_page_config(page_title="Locked", layout="wide", page_icon="optra_logo_transparent.png")
-   st.markdown("""
-       <style>
-       html, body, [data-testid="stAppViewContainer"] {
-           background: linear-gradient(to bottom, #0a0a0a 0%, #0a0a0a 10%, #0d0f1c 30%, #0f111f 60%, #00011d 100%) !important;
-           color: #ffffff !important;
-       }
-       section[data-testid="stSidebar"] {
-           background-color: #000 !important;
-       }
-       section[data-testid="stSidebar"] * {
-           color: #fff !important;
-       }
-       </style>
-   """, unsafe_allow_html=True)
+   st.markdown(THEME_CSS, unsafe_allow_html=True)
 
 
    logo_b64 = get_logo_base64()
@@ -0,0 +1,92 @@
+# ingest_jobs.py
+"""
+Background ingestion of uploaded documents.
+
+Jobs are keyed on (user_id, sha256 of the file bytes): submitting the same
+upload again — e.g. on every Streamlit rerun while the file sits in the
+uploader — returns the existing job instead of re-embedding the document.
+The worker pool and job registry are shared by every session in the process.
+Finished jobs are evicted after FINISHED_JOB_TTL_SECONDS (oldest first beyond
+MAX_FINISHED_JOBS); resubmitting an evicted upload is cheap, since ingestion
+only embeds chunks its manifest hasn't seen.
+"""
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Optional
+
+import streamlit as st
+
+from vector_store import add_document
+
+
+INGEST_JOB_WORKERS = 2
+FINISHED_JOB_TTL_SECONDS = 3600
+MAX_FINISHED_JOBS = 200
+
+
+@st.cache_resource(show_spinner=False)
+def _get_job_registry():
+    return {
+        "pool": ThreadPoolExecutor(max_workers=INGEST_JOB_WORKERS, thread_name_prefix="optra-ingest-job"),
+        "jobs": {},
+        "finished": {},  # key -> monotonic time the job was first seen done
+        "lock": threading.Lock(),
+    }
+
+
+def _run(text: str, doc_id_prefix: str, metadata: dict, user_id: str, doc_key: str):
+    t0 = time.perf_counter()
+    result = add_document(text=text, doc_id_prefix=doc_id_prefix, metadata=metadata, user_id=user_id, doc_key=doc_key)
+    result["seconds"] = round(time.perf_counter() - t0, 3)
+    return result
+
+
+def _evict_finished(registry: dict, now: float):
+    """Drop finished jobs past the TTL, then the oldest ones beyond the cap. Call with the lock held."""
+    jobs, finished = registry["jobs"], registry["finished"]
+    for key, job in jobs.items():
+        if key not in finished and job.done():
+            finished[key] = now
+    expired = [key for key, t in finished.items() if now - t > FINISHED_JOB_TTL_SECONDS]
+    overflow = len(finished) - len(expired) - MAX_FINISHED_JOBS
+    if overflow > 0:
+        live = sorted((t, key) for key, t in finished.items() if now - t <= FINISHED_JOB_TTL_SECONDS)
+        expired += [key for _, key in live[:overflow]]
+    for key in expired:
+        finished.pop(key, None)
+        jobs.pop(key, None)
+
+
+def submit_document(user_id: str, content_hash: str, text: str, doc_id_prefix: str,
+                    metadata: dict, doc_key: Optional[str] = None, retry_failed: bool = False) -> Future:
+    """
+    Queue add_document for this upload unless an identical one is queued, running or done.
+    A failed job is only resubmitted when retry_failed is set (the checkpoint lets it resume).
+    """
+    registry = _get_job_registry()
+    key = (user_id, content_hash)
+    with registry["lock"]:
+        _evict_finished(registry, time.monotonic())
+        job = registry["jobs"].get(key)
+        failed = job is not None and job.done() and job.exception() is not None
+        if job is not None and not (failed and retry_failed):
+            return job
+        job = registry["pool"].submit(
+            _run, text, doc_id_prefix, metadata, user_id, doc_key or doc_id_prefix
+        )
+        registry["jobs"][key] = job
+        registry["finished"].pop(key, None)
+        return job
+
+
+def document_status(user_id: str, content_hash: str) -> dict:
+    """{"state": "missing" | "running" | "done" | "failed", "result" | "error": ...}"""
+    job = _get_job_registry()["jobs"].get((user_id, content_hash))
+    if job is None:
+        return {"state": "missing"}
+    if not job.done():
+        return {"state": "running"}
+    if job.exception() is not None:
+        return {"state": "failed", "error": str(job.exception())}
+    return {"state": "done", "result": job.result()}
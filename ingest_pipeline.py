@@ -0,0 +1,199 @@
+# ingest_pipeline.py
+"""
+Producer/consumer ingestion: chunk batches are embedded on a bounded worker
+pool and each embedded batch is immediately split into size-bounded upsert
+pages, so embedding of later batches overlaps with upserts of earlier ones.
+
+Every network call goes through with_retry (jittered exponential backoff on
+429 / 5xx / connection errors). Completed batches are recorded in a JSON
+checkpoint so a failed ingestion resumes where it stopped.
+"""
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, Optional
+
+
+# Pinecone caps a request at 2 MB and recommends <= 1000 vectors; stay well inside
+UPSERT_MAX_BYTES = 1_500_000
+UPSERT_MAX_VECTORS = 200
+
+
+# ==========================================================
+# ✅ Retry with jittered backoff
+# ==========================================================
+def _status_code(exc: BaseException) -> Optional[int]:
+    for attr in ("status", "status_code", "http_status"):
+        code = getattr(exc, attr, None)
+        if isinstance(code, int):
+            return code
+    response = getattr(exc, "response", None)
+    code = getattr(response, "status_code", None) or getattr(response, "status", None)
+    return code if isinstance(code, int) else None
+
+
+def is_retryable_error(exc: BaseException) -> bool:
+    code = _status_code(exc)
+    if code is not None:
+        return code == 429 or code >= 500
+    name = type(exc).__name__.lower()
+    return "timeout" in name or "connection" in name or "ratelimit" in name
+
+
+def with_retry(fn: Callable, *, attempts: int = 5, base_delay: float = 0.5, max_delay: float = 20.0,
+               is_retryable: Callable[[BaseException], bool] = is_retryable_error):
+    """Call fn(), retrying retryable errors with full-jitter exponential backoff."""
+    for attempt in range(attempts):
+        try:
+            return fn()
+        except Exception as exc:
+            if attempt == attempts - 1 or not is_retryable(exc):
+                raise
+            time.sleep(random.uniform(0, min(max_delay, base_delay * 2 ** attempt)))
+
+
+# ==========================================================
+# ✅ Upsert paging
+# ==========================================================
+def _vector_size(vector: tuple) -> int:
+    """Rough serialized size of (id, values, metadata) as sent over JSON."""
+    vid, values = vector[0], vector[1]
+    metadata = vector[2] if len(vector) > 2 else None
+    return len(str(vid)) + 12 * len(values) + (len(json.dumps(metadata, default=str)) if metadata else 0) + 32
+
+
+def page_vectors(vectors: list, max_bytes: int = UPSERT_MAX_BYTES, max_count: int = UPSERT_MAX_VECTORS):
+    """Split vectors into upsert pages bounded by estimated request size and vector count."""
+    page, page_bytes = [], 0
+    for vector in vectors:
+        size = _vector_size(vector)
+        if page and (len(page) >= max_count or page_bytes + size > max_bytes):
+            yield page
+            page, page_bytes = [], 0
+        page.append(vector)
+        page_bytes += size
+    if page:
+        yield page
+
+
+# ==========================================================
+# ✅ Checkpoints
+# ==========================================================
+class IngestCheckpoint:
+    """Set of chunk positions already upserted for one (namespace, document, content) triple."""
+
+    def __init__(self, path: Optional[str]):
+        self.path = path
+        self.done: set[int] = set()
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    self.done = set(json.load(f).get("done", []))
+            except (OSError, ValueError):
+                self.done = set()
+
+    @classmethod
+    def for_document(cls, directory: Optional[str], namespace: str, doc_key: str, chunks: list[str]):
+        if not directory:
+            return cls(None)
+        digest = hashlib.sha256()
+        for part in (namespace, doc_key, *chunks):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        os.makedirs(directory, exist_ok=True)
+        return cls(os.path.join(directory, f"{digest.hexdigest()[:32]}.json"))
+
+    def mark(self, positions: Iterable[int]):
+        with self._lock:
+            self.done.update(positions)
+            if not self.path:
+                return
+            tmp = f"{self.path}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"done": sorted(self.done)}, f)
+            os.replace(tmp, self.path)
+
+    def complete(self):
+        """Ingestion finished; the checkpoint is no longer needed."""
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+# ==========================================================
+# ✅ Pipeline
+# ==========================================================
+def run_pipeline(
+    chunks: list[str],
+    batches: Iterable[tuple[list[int], int]],
+    embed_fn: Callable[[list[str]], list],
+    make_vector: Callable[[int, list], tuple],
+    upsert_fn: Callable[[list], None],
+    checkpoint: Optional[IngestCheckpoint] = None,
+    embed_workers: int = 2,
+    upsert_workers: int = 2,
+    max_bytes: int = UPSERT_MAX_BYTES,
+    max_count: int = UPSERT_MAX_VECTORS,
+) -> list[dict]:
+    """
+    Embed and upsert chunk batches with bounded concurrency.
+
+    batches yields (positions, token_count) groups of chunk positions; positions
+    already in the checkpoint should be filtered out by the caller. Returns one
+    stats dict per batch: batch, start, size, tokens, embed_seconds, upsert_seconds, pages.
+    """
+    checkpoint = checkpoint or IngestCheckpoint(None)
+    stats: list[dict] = []
+    errors: list[BaseException] = []
+    in_flight = threading.BoundedSemaphore(embed_workers * 2)
+    lock = threading.Lock()
+
+    def process(batch_no: int, positions: list[int], tokens: int, upsert_pool: ThreadPoolExecutor):
+        try:
+            if errors:
+                return
+            t0 = time.perf_counter()
+            embeddings = with_retry(lambda: embed_fn([chunks[p] for p in positions]))
+            t1 = time.perf_counter()
+            vectors = [make_vector(p, e) for p, e in zip(positions, embeddings)]
+            pages = list(page_vectors(vectors, max_bytes=max_bytes, max_count=max_count))
+            futures = [upsert_pool.submit(with_retry, lambda page=page: upsert_fn(page)) for page in pages]
+            for future in futures:
+                future.result()
+            t2 = time.perf_counter()
+            checkpoint.mark(positions)
+            with lock:
+                stats.append({
+                    "batch": batch_no,
+                    "start": positions[0],
+                    "size": len(positions),
+                    "tokens": tokens,
+                    "embed_seconds": round(t1 - t0, 4),
+                    "upsert_seconds": round(t2 - t1, 4),
+                    "pages": len(pages),
+                })
+        except BaseException as exc:
+            with lock:
+                errors.append(exc)
+        finally:
+            in_flight.release()
+
+    with ThreadPoolExecutor(max_workers=upsert_workers, thread_name_prefix="optra-upsert") as upsert_pool, \
+         ThreadPoolExecutor(max_workers=embed_workers, thread_name_prefix="optra-embed") as embed_pool:
+        for batch_no, (positions, tokens) in enumerate(batches):
+            if not positions:
+                continue
+            in_flight.acquire()
+            if errors:
+                in_flight.release()
+                break
+            embed_pool.submit(process, batch_no, positions, tokens, upsert_pool)
+
+    if errors:
+        raise errors[0]
+    stats.sort(key=lambda s: s["batch"])
+    return stats
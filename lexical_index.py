@@ -0,0 +1,160 @@
+# lexical_index.py
+"""
+BM25 keyword index over the public grant corpus, plus reciprocal rank fusion
+(RRF) for merging it with dense (Pinecone / LocalIndex) results.
+
+Scheme names and acronyms (PSG, EDG, SFEC, MRA, E2F) are exact-match problems
+that dense similarity handles poorly, so search_grants fuses both rankings.
+"""
+import json
+import math
+import re
+import threading
+from collections import Counter, defaultdict
+from typing import Iterable, Optional
+
+from local_index import Match
+
+
+_TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9&]*")
+
+
+def tokenize(text: str) -> list[str]:
+    return _TOKEN_RE.findall((text or "").lower())
+
+
+# ==========================================================
+# ✅ BM25 index
+# ==========================================================
+class BM25Index:
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._postings: dict[str, dict[str, int]] = defaultdict(dict)
+        self._doc_len: dict[str, int] = {}
+        self._doc_terms: dict[str, list[str]] = {}
+        self._metadata: dict[str, Optional[dict]] = {}
+        self._total_len = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._doc_len)
+
+    def add(self, doc_id: str, text: str, metadata: Optional[dict] = None):
+        counts = Counter(tokenize(text))
+        with self._lock:
+            self._remove(doc_id)
+            for term, tf in counts.items():
+                self._postings[term][doc_id] = tf
+            length = sum(counts.values())
+            self._doc_len[doc_id] = length
+            self._doc_terms[doc_id] = list(counts)
+            self._metadata[doc_id] = metadata
+            self._total_len += length
+
+    def remove(self, doc_id: str):
+        with self._lock:
+            self._remove(doc_id)
+
+    def _remove(self, doc_id: str):
+        if doc_id not in self._doc_len:
+            return
+        for term in self._doc_terms.pop(doc_id):
+            posting = self._postings.get(term)
+            if posting is not None:
+                posting.pop(doc_id, None)
+                if not posting:
+                    del self._postings[term]
+        self._total_len -= self._doc_len.pop(doc_id)
+        self._metadata.pop(doc_id, None)
+
+    def search(self, query: str, top_k: int = 5) -> list[Match]:
+        terms = set(tokenize(query))
+        with self._lock:
+            n_docs = len(self._doc_len)
+            if not n_docs or not terms:
+                return []
+            avgdl = self._total_len / n_docs
+            scores: dict[str, float] = defaultdict(float)
+            for term in terms:
+                posting = self._postings.get(term)
+                if not posting:
+                    continue
+                idf = math.log(1 + (n_docs - len(posting) + 0.5) / (len(posting) + 0.5))
+                for doc_id, tf in posting.items():
+                    norm = self.k1 * (1 - self.b + self.b * self._doc_len[doc_id] / avgdl)
+                    scores[doc_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+            best = sorted(scores.items(), key=lambda kv: kv[1], reverse=True)[:top_k]
+            return [Match(id=doc_id, score=score, metadata=self._metadata.get(doc_id)) for doc_id, score in best]
+
+
+# ==========================================================
+# ✅ Corpus loading
+# ==========================================================
+def _slug(name: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "_", name.lower()).strip("_")
+
+
+def grant_data_documents(path: str = "data/grants_data.json") -> list[tuple[str, str, dict]]:
+    """Flatten data/grants_data.json into (doc_id, text, metadata) tuples, one per grant."""
+    with open(path, "r", encoding="utf-8") as f:
+        grants = json.load(f)
+    docs = []
+    for name, info in grants.items():
+        parts = [name]
+        for value in info.values():
+            if isinstance(value, list):
+                parts.extend(str(v) for v in value)
+            elif value:
+                parts.append(str(value))
+        docs.append((
+            f"grantsdata_{_slug(name)}",
+            "\n".join(parts),
+            {"type": "grant_data", "grant": name, "source": "grants_data.json"},
+        ))
+    return docs
+
+
+def grant_database_documents(grants: list[dict]) -> list[tuple[str, str, dict]]:
+    """Same flattening for utils.grant_database.get_all_grants() entries."""
+    docs = []
+    for g in grants:
+        parts = [g["name"], g.get("type", ""), g.get("description", ""),
+                 ", ".join(g.get("sectors") or []), ", ".join(g.get("supported_goals") or [])]
+        docs.append((
+            f"grantdb_{_slug(g['name'])}",
+            "\n".join(p for p in parts if p),
+            {"type": "grant_database", "grant": g["name"], "link": g.get("link", ""), "source": "grant_database"},
+        ))
+    return docs
+
+
+def build_public_index(grants_path: Optional[str] = "data/grants_data.json") -> BM25Index:
+    bm25 = BM25Index()
+    if grants_path:
+        try:
+            for doc_id, text, metadata in grant_data_documents(grants_path):
+                bm25.add(doc_id, text, metadata)
+        except FileNotFoundError:
+            pass
+    return bm25
+
+
+# ==========================================================
+# ✅ Reciprocal rank fusion
+# ==========================================================
+def reciprocal_rank_fusion(rankings: Iterable[list], k: int = 60, top_k: Optional[int] = None) -> list[Match]:
+    """
+    Fuse ranked match lists: score(d) = sum over lists of 1 / (k + rank).
+    The first list a match appears in supplies its metadata.
+    """
+    fused: dict[str, float] = defaultdict(float)
+    metadata: dict[str, Optional[dict]] = {}
+    for ranking in rankings:
+        for rank, match in enumerate(ranking, start=1):
+            fused[match.id] += 1.0 / (k + rank)
+            metadata.setdefault(match.id, match.metadata)
+    ordered = sorted(fused.items(), key=lambda kv: kv[1], reverse=True)
+    if top_k is not None:
+        ordered = ordered[:top_k]
+    return [Match(id=doc_id, score=score, metadata=metadata[doc_id]) for doc_id, score in ordered]
@@ -0,0 +1,491 @@
+# local_index.py
+"""
+In-process vector index that mirrors the slice of the Pinecone Index API
+used by vector_store (upsert / update / query / delete / list / fetch /
+describe_index_stats).
+
+Vectors live in NumPy arrays per namespace. Small namespaces are searched
+with a brute-force matmul; namespaces at or above ann_threshold get an IVF
+(k-means inverted file) structure searched over the n_probe closest lists
+(by default a tenth of the lists, at least 8).
+"""
+import atexit
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+import numpy as np
+
+
+# ==========================================================
+# ✅ Response types (attribute access like the Pinecone client)
+# ==========================================================
+@dataclass
+class Match:
+    id: str
+    score: float
+    metadata: Optional[dict] = None
+    values: Optional[list] = None
+
+
+@dataclass
+class QueryResponse:
+    matches: list
+    namespace: str = ""
+
+
+@dataclass
+class Vector:
+    id: str
+    values: list
+    metadata: Optional[dict] = None
+
+
+@dataclass
+class FetchResponse:
+    vectors: dict = field(default_factory=dict)
+    namespace: str = ""
+
+
+# ==========================================================
+# ✅ Metadata filters (Pinecone operator subset)
+# ==========================================================
+def _match_condition(value: Any, cond: Any) -> bool:
+    if not isinstance(cond, dict):
+        return value == cond
+    for op, arg in cond.items():
+        if op == "$eq" and not value == arg:
+            return False
+        if op == "$ne" and not value != arg:
+            return False
+        if op == "$in" and value not in arg:
+            return False
+        if op == "$nin" and value in arg:
+            return False
+        if op in ("$gt", "$gte", "$lt", "$lte"):
+            if value is None:
+                return False
+            if op == "$gt" and not value > arg:
+                return False
+            if op == "$gte" and not value >= arg:
+                return False
+            if op == "$lt" and not value < arg:
+                return False
+            if op == "$lte" and not value <= arg:
+                return False
+    return True
+
+
+def matches_filter(metadata: Optional[dict], flt: Optional[dict]) -> bool:
+    if not flt:
+        return True
+    metadata = metadata or {}
+    for key, cond in flt.items():
+        if key == "$and":
+            if not all(matches_filter(metadata, f) for f in cond):
+                return False
+        elif key == "$or":
+            if not any(matches_filter(metadata, f) for f in cond):
+                return False
+        elif not _match_condition(metadata.get(key), cond):
+            return False
+    return True
+
+
+# ==========================================================
+# ✅ Per-namespace storage
+# ==========================================================
+def _normalize_rows(mat: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(mat, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return mat / norms
+
+
+class _Namespace:
+    def __init__(self, dimension: int):
+        self.dimension = dimension
+        self.ids: list[str] = []
+        self.pos: dict[str, int] = {}
+        self.metadata: list[Optional[dict]] = []
+        self.raw = np.zeros((0, dimension), dtype=np.float32)   # values as upserted
+        self.unit = np.zeros((0, dimension), dtype=np.float32)  # L2-normalised for cosine
+        self.size = 0
+        # IVF state
+        self.centroids: Optional[np.ndarray] = None
+        self.lists: list[np.ndarray] = []
+        self.ivf_size = 0      # rows covered by the IVF lists
+        self.ivf_dirty = 0     # in-place updates since the last build
+        # Deletes while an IVF exists only tombstone their row (swap-remove would renumber
+        # rows the lists point at); tombstoned rows are compacted away past a threshold.
+        self.dead = np.zeros(0, dtype=bool)
+        self.n_dead = 0
+
+    @property
+    def live_count(self) -> int:
+        return self.size - self.n_dead
+
+    def live_rows(self) -> np.ndarray:
+        rows = np.arange(self.size)
+        return rows[~self.dead[:self.size]] if self.n_dead else rows
+
+    def _reserve(self, extra: int):
+        need = self.size + extra
+        if need <= self.raw.shape[0]:
+            return
+        cap = max(need, self.raw.shape[0] * 2, 64)
+        for name in ("raw", "unit"):
+            grown = np.zeros((cap, self.dimension), dtype=np.float32)
+            grown[:self.size] = getattr(self, name)[:self.size]
+            setattr(self, name, grown)
+        dead = np.zeros(cap, dtype=bool)
+        dead[:self.size] = self.dead[:self.size]
+        self.dead = dead
+
+    def upsert(self, items: list[tuple[str, np.ndarray, Optional[dict]]]):
+        self._reserve(len(items))
+        for vid, values, meta in items:
+            row = self.pos.get(vid)
+            if row is None:
+                row = self.size
+                self.pos[vid] = row
+                self.ids.append(vid)
+                self.metadata.append(meta)
+                self.size += 1
+            else:
+                self.metadata[row] = meta
+                if row < self.ivf_size:
+                    self.ivf_dirty += 1
+            self.raw[row] = values
+            norm = float(np.linalg.norm(values)) or 1.0
+            self.unit[row] = values / norm
+
+    def delete(self, ids: list[str]):
+        if self.centroids is not None:
+            self._tombstone(ids)
+            return
+        for vid in ids:
+            row = self.pos.pop(vid, None)
+            if row is None:
+                continue
+            last = self.size - 1
+            if row != last:
+                # swap-remove keeps the arrays dense
+                moved = self.ids[last]
+                self.ids[row] = moved
+                self.metadata[row] = self.metadata[last]
+                self.raw[row] = self.raw[last]
+                self.unit[row] = self.unit[last]
+                self.pos[moved] = row
+            self.ids.pop()
+            self.metadata.pop()
+            self.size -= 1
+
+    def _tombstone(self, ids: list[str]):
+        for vid in ids:
+            row = self.pos.pop(vid, None)
+            if row is None:
+                continue
+            self.dead[row] = True
+            self.metadata[row] = None
+            self.n_dead += 1
+        # Same threshold as ivf_dirty: past it, compact and let the next query rebuild the lists
+        if self.n_dead > self.ivf_size // 10:
+            self.compact()
+
+    def compact(self):
+        """Drop tombstoned rows (renumbering the rest) and the IVF lists that pointed at them."""
+        if self.n_dead:
+            keep = self.live_rows()
+            n = len(keep)
+            self.ids = [self.ids[r] for r in keep]
+            self.metadata = [self.metadata[r] for r in keep]
+            self.raw[:n] = self.raw[keep]
+            self.unit[:n] = self.unit[keep]
+            self.dead[:] = False
+            self.size, self.n_dead = n, 0
+            self.pos = {vid: i for i, vid in enumerate(self.ids)}
+        self._drop_ivf()
+
+    def _drop_ivf(self):
+        self.centroids = None
+        self.lists = []
+        self.ivf_size = 0
+        self.ivf_dirty = 0
+
+    def build_ivf(self, n_lists: Optional[int] = None, iterations: int = 10, seed: int = 0):
+        """Cluster the namespace with spherical k-means and build inverted lists."""
+        n = self.size
+        if n == 0:
+            self._drop_ivf()
+            return
+        k = n_lists or max(1, int(np.sqrt(n)))
+        k = min(k, n)
+        data = self.unit[:n]
+        rng = np.random.default_rng(seed)
+        sample = data[rng.choice(n, size=min(n, k * 64), replace=False)]
+        centroids = sample[rng.choice(sample.shape[0], size=k, replace=False)].copy()
+        for _ in range(iterations):
+            assign = np.argmax(sample @ centroids.T, axis=1)
+            for c in range(k):
+                members = sample[assign == c]
+                if len(members):
+                    centroids[c] = members.mean(axis=0)
+            centroids = _normalize_rows(centroids)
+        assign = np.argmax(data @ centroids.T, axis=1)
+        self.centroids = centroids.astype(np.float32)
+        self.lists = [np.flatnonzero(assign == c) for c in range(k)]
+        self.ivf_size = n
+        self.ivf_dirty = 0
+
+    def candidates(self, q: np.ndarray, n_probe: int) -> np.ndarray:
+        probe = np.argsort(-(self.centroids @ q))[:n_probe]
+        parts = [self.lists[c] for c in probe]
+        # rows appended after the last build are always scanned
+        if self.size > self.ivf_size:
+            parts.append(np.arange(self.ivf_size, self.size))
+        return np.concatenate(parts) if parts else np.zeros(0, dtype=np.int64)
+
+
+# ==========================================================
+# ✅ LocalIndex
+# ==========================================================
+class LocalIndex:
+    """
+    Drop-in stand-in for a Pinecone Index handle (cosine metric).
+    If path is given, each namespace is persisted to <path>/<namespace>.npz
+    and reloaded on start. Writes only mark their namespace dirty; dirty
+    namespaces are saved at most every save_interval seconds (in the
+    background), on flush() / persist(), and at interpreter exit, so bulk
+    ingestion doesn't rewrite the whole file for every page of vectors.
+    save_interval=0 saves synchronously on every write.
+    """
+
+    def __init__(
+        self,
+        dimension: int,
+        path: Optional[str] = None,
+        ann_threshold: int = 20_000,
+        n_probe: Optional[int] = None,
+        autosave: bool = True,
+        save_interval: float = 2.0,
+    ):
+        self.dimension = dimension
+        self.path = path
+        self.ann_threshold = ann_threshold
+        self.n_probe = n_probe
+        self.autosave = autosave
+        self.save_interval = save_interval
+        self._namespaces: dict[str, _Namespace] = {}
+        self._lock = threading.RLock()
+        self._write_lock = threading.Lock()  # serializes file writes, taken outside _lock
+        self._dirty: set[str] = set()
+        self._save_timer: Optional[threading.Timer] = None
+        self.last_save_seconds = 0.0
+        if path:
+            os.makedirs(path, exist_ok=True)
+            self._load()
+            atexit.register(self.flush)
+
+    # ---------- writes ----------
+    def upsert(self, vectors, namespace: str = "", **_):
+        items = []
+        for v in vectors:
+            if isinstance(v, dict):
+                vid, values, meta = v["id"], v["values"], v.get("metadata")
+            else:
+                vid, values = v[0], v[1]
+                meta = v[2] if len(v) > 2 else None
+            arr = np.asarray(values, dtype=np.float32)
+            if arr.shape != (self.dimension,):
+                raise ValueError(
+                    f"Vector dimension {arr.shape[-1] if arr.ndim else 0} does not match index dimension {self.dimension}"
+                )
+            items.append((str(vid), arr, dict(meta) if meta else None))
+        with self._lock:
+            ns = self._namespaces.setdefault(namespace, _Namespace(self.dimension))
+            ns.upsert(items)
+            self._save(namespace)
+        return {"upserted_count": len(items)}
+
+    def delete(self, ids: Optional[list] = None, delete_all: bool = False, namespace: str = "",
+               filter: Optional[dict] = None, **_):
+        with self._lock:
+            ns = self._namespaces.get(namespace)
+            if ns is None:
+                return {}
+            if delete_all:
+                del self._namespaces[namespace]
+                self._dirty.discard(namespace)
+                self._remove_file(namespace)
+                return {}
+            targets = list(ids or [])
+            if filter:
+                targets += [ns.ids[r] for r in ns.live_rows() if matches_filter(ns.metadata[r], filter)]
+            ns.delete(targets)
+            self._save(namespace)
+        return {}
+
+    def update(self, id: str, values=None, set_metadata: Optional[dict] = None, namespace: str = "", **_):
+        """Overwrite a vector's values and/or merge keys into its metadata (Pinecone semantics)."""
+        with self._lock:
+            ns = self._namespaces.get(namespace)
+            row = ns.pos.get(id) if ns else None
+            if row is None:
+                return {}
+            new_values = ns.raw[row] if values is None else np.asarray(values, dtype=np.float32)
+            meta = dict(ns.metadata[row] or {})
+            meta.update(set_metadata or {})
+            ns.upsert([(id, new_values, meta)])
+            self._save(namespace)
+        return {}
+
+    # ---------- reads ----------
+    def query(self, vector=None, top_k: int = 10, include_metadata: bool = False,
+              include_values: bool = False, namespace: str = "", filter: Optional[dict] = None,
+              id: Optional[str] = None, **_):
+        with self._lock:
+            ns = self._namespaces.get(namespace)
+            if ns is None or ns.live_count == 0:
+                return QueryResponse(matches=[], namespace=namespace)
+            if vector is None and id is not None:
+                vector = ns.raw[ns.pos[id]]
+            q = np.asarray(vector, dtype=np.float32)
+            q = q / (float(np.linalg.norm(q)) or 1.0)
+
+            if ns.size >= self.ann_threshold:
+                if ns.centroids is None or ns.ivf_dirty > ns.ivf_size // 10:
+                    ns.compact()
+                    ns.build_ivf()
+                n_probe = self.n_probe or max(8, len(ns.lists) // 10)
+                rows = ns.candidates(q, n_probe)
+                if ns.n_dead:
+                    rows = rows[~ns.dead[rows]]
+            else:
+                rows = ns.live_rows()
+            scores = ns.unit[rows] @ q
+
+            if filter:
+                keep = np.array([matches_filter(ns.metadata[r], filter) for r in rows], dtype=bool)
+                rows, scores = rows[keep], scores[keep]
+
+            k = min(top_k, len(rows))
+            if k == 0:
+                return QueryResponse(matches=[], namespace=namespace)
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            matches = [
+                Match(
+                    id=ns.ids[rows[i]],
+                    score=float(scores[i]),
+                    metadata=ns.metadata[rows[i]] if include_metadata else None,
+                    values=ns.raw[rows[i]].tolist() if include_values else None,
+                )
+                for i in top
+            ]
+        return QueryResponse(matches=matches, namespace=namespace)
+
+    def list(self, prefix: str = "", namespace: str = "", limit: int = 100, **_):
+        """Yield pages of vector ids starting with prefix (Pinecone serverless list())."""
+        with self._lock:
+            ns = self._namespaces.get(namespace)
+            ids = sorted(vid for vid in ns.pos if vid.startswith(prefix)) if ns else []
+        for i in range(0, len(ids), limit):
+            yield ids[i:i + limit]
+
+    def fetch(self, ids: list, namespace: str = "", **_):
+        with self._lock:
+            ns = self._namespaces.get(namespace)
+            out = {}
+            if ns is not None:
+                for vid in ids:
+                    row = ns.pos.get(vid)
+                    if row is not None:
+                        out[vid] = Vector(id=vid, values=ns.raw[row].tolist(), metadata=ns.metadata[row])
+        return FetchResponse(vectors=out, namespace=namespace)
+
+    def describe_index_stats(self, **_):
+        with self._lock:
+            namespaces = {name: {"vector_count": ns.live_count} for name, ns in self._namespaces.items()}
+        return {
+            "dimension": self.dimension,
+            "namespaces": namespaces,
+            "total_vector_count": sum(n["vector_count"] for n in namespaces.values()),
+        }
+
+    # ---------- persistence ----------
+    def _file(self, namespace: str) -> str:
+        safe = namespace or "__default__"
+        return os.path.join(self.path, f"{safe}.npz")
+
+    def _save(self, namespace: str):
+        """Called with _lock held after a write: mark dirty and schedule a save."""
+        if not (self.path and self.autosave):
+            return
+        if self.save_interval <= 0:
+            self.persist(namespace)
+            return
+        self._dirty.add(namespace)
+        if self._save_timer is None:
+            self._save_timer = threading.Timer(self.save_interval, self.flush)
+            self._save_timer.daemon = True
+            self._save_timer.start()
+
+    def flush(self):
+        """Save every namespace written since the last save."""
+        with self._lock:
+            names, self._dirty = self._dirty, set()
+            if self._save_timer is not None:
+                self._save_timer.cancel()
+                self._save_timer = None
+        for name in names:
+            self.persist(name)
+
+    def persist(self, namespace: Optional[str] = None):
+        """Write one namespace (or all of them) to disk."""
+        if not self.path:
+            return
+        with self._write_lock:
+            with self._lock:
+                names = [namespace] if namespace is not None else list(self._namespaces)
+                # Snapshot under the lock; the slow file write happens without it
+                snapshots = []
+                for name in names:
+                    ns = self._namespaces.get(name)
+                    if ns is None:
+                        continue
+                    self._dirty.discard(name)
+                    rows = ns.live_rows()  # tombstoned rows are never written
+                    snapshots.append((name, ns.raw[rows], json.dumps([ns.ids[r] for r in rows]),
+                                      json.dumps([ns.metadata[r] for r in rows])))
+            t0 = time.perf_counter()
+            for name, vectors, ids, metadata in snapshots:
+                tmp = self._file(name) + ".tmp.npz"
+                np.savez(tmp, vectors=vectors, ids=np.array(ids), metadata=np.array(metadata))
+                os.replace(tmp, self._file(name))
+                with self._lock:
+                    if name not in self._namespaces:
+                        self._remove_file(name)  # deleted while it was being written
+            self.last_save_seconds = time.perf_counter() - t0
+
+    def _remove_file(self, namespace: str):
+        if self.path and os.path.exists(self._file(namespace)):
+            os.remove(self._file(namespace))
+
+    def _load(self):
+        for fname in os.listdir(self.path):
+            if not fname.endswith(".npz") or fname.endswith(".tmp.npz"):
+                continue
+            name = fname[:-4]
+            name = "" if name == "__default__" else name
+            with np.load(os.path.join(self.path, fname)) as data:
+                ids = json.loads(str(data["ids"]))
+                metadata = json.loads(str(data["metadata"]))
+                vectors = data["vectors"].astype(np.float32)
+            if vectors.shape[1:] != (self.dimension,) and len(ids):
+                raise ValueError(f"Stored namespace '{name}' has dimension {vectors.shape[1]}, expected {self.dimension}")
+            ns = _Namespace(self.dimension)
+            ns.upsert(list(zip(ids, vectors, metadata)))
+            self._namespaces[name] = ns
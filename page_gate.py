@@ -0,0 +1,140 @@
+# page_gate.py
+import threading
+import time
+from typing import Optional
+
+import streamlit as st
+
+from assets import THEME_CSS
+from auth import is_token_current, verify_token
+from globals import get_user_plan, show_locked_page
+
+
+# ==========================================================
+# ✅ Settings
+# ==========================================================
+PAID_PLANS = ("Starter Plan", "Pro Plan")
+PRINCIPAL_KEY = "auth_principal"   # "auth_" prefix: Home's logout/relogin clears it with the rest
+PRINCIPAL_TTL_SECONDS = 300        # re-resolve at least this often, even with a longer-lived token
+LOCKED_MESSAGE = "🔒 This page is locked. Please unlock access on the Home page."
+
+
+# ==========================================================
+# ✅ Gate timing (process-wide)
+# ==========================================================
+class GateTimings:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {"warm": [0, 0.0, 0.0], "cold": [0, 0.0, 0.0]}  # count, total_ms, max_ms
+
+    def record(self, kind: str, ms: float):
+        with self._lock:
+            s = self._stats[kind]
+            s[0] += 1
+            s[1] += ms
+            s[2] = max(s[2], ms)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                kind: {"calls": n, "avg_ms": round(total / n, 3) if n else 0.0, "max_ms": round(mx, 3)}
+                for kind, (n, total, mx) in self._stats.items()
+            }
+
+
+@st.cache_resource(show_spinner=False)
+def _get_timings() -> GateTimings:
+    return GateTimings()
+
+
+def gate_stats() -> dict:
+    """{"warm": {...}, "cold": {...}} gate latency since process start; the last call is in session_state."""
+    return _get_timings().snapshot()
+
+
+# ==========================================================
+# ✅ Principal resolution
+# ==========================================================
+def _query_token() -> Optional[str]:
+    token = st.query_params.get("token")
+    return token[0] if isinstance(token, list) else token
+
+
+def remember_principal(email: str, plan: Optional[str], token: Optional[str] = None,
+                       token_payload: Optional[dict] = None) -> dict:
+    """Memoize the principal for this session (also used by Home right after a successful unlock)."""
+    now = time.time()
+    expires_at = now + PRINCIPAL_TTL_SECONDS
+    if token_payload and token_payload.get("exp"):
+        expires_at = min(expires_at, float(token_payload["exp"]))
+    principal = {
+        "email": email,
+        "plan": plan,
+        "token": token,
+        "payload": token_payload,
+        "expires_at": expires_at,
+    }
+    st.session_state[PRINCIPAL_KEY] = principal
+    return principal
+
+
+def _memoized(token: Optional[str]) -> Optional[dict]:
+    principal = st.session_state.get(PRINCIPAL_KEY)
+    if not principal or time.time() >= principal["expires_at"]:
+        return None
+    if token != principal["token"]:
+        return None  # logged in / out in another way since it was memoized
+    if principal["payload"] and not is_token_current(principal["payload"]):
+        return None  # revoked or plan changed (in-memory list, no network)
+    return principal
+
+
+def resolve_principal() -> dict:
+    """Email + plan for this session: token first, then get_user_plan (cached) for older tokens."""
+    token = _query_token()
+    decoded = verify_token()
+    email = st.session_state.get("user_email") or (decoded or {}).get("email")
+    plan = decoded.get("plan") if decoded and decoded.get("email") == email else None
+    if not plan:
+        plan = get_user_plan(email) if email else None
+    return remember_principal(email, plan, token, decoded)
+
+
+# ==========================================================
+# ✅ Gate
+# ==========================================================
+def require_access(
+    allowed_plans=PAID_PLANS,
+    locked_message: str = LOCKED_MESSAGE,
+    on_denied: str = "lock",
+    theme: bool = True,
+) -> dict:
+    """
+    The access check at the top of every page. Resolves the principal once per session
+    (memoized in session_state until PRINCIPAL_TTL_SECONDS or token expiry), so later
+    reruns and page switches return immediately. Denied users get the locked page
+    (on_denied="lock") or a bare st.stop() (on_denied="stop", for Home's own login UI).
+    Keeps user_email / user_plan / unlocked in sync and returns the principal.
+    """
+    t0 = time.perf_counter()
+    principal = _memoized(_query_token())
+    kind = "warm" if principal else "cold"
+    if principal is None:
+        principal = resolve_principal()
+    ms = (time.perf_counter() - t0) * 1000
+    _get_timings().record(kind, ms)
+    st.session_state["auth_gate_ms"] = round(ms, 3)
+
+    if principal["plan"] not in allowed_plans:
+        # Not memoized: a new subscriber shouldn't wait out the TTL
+        st.session_state.pop(PRINCIPAL_KEY, None)
+        if on_denied == "stop":
+            st.stop()
+        show_locked_page(locked_message)
+
+    st.session_state["user_email"] = principal["email"]
+    st.session_state["user_plan"] = principal["plan"]
+    st.session_state["unlocked"] = True
+    if theme:
+        st.markdown(THEME_CSS, unsafe_allow_html=True)
+    return principal
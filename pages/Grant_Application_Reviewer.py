@@ -1,52 +1,14 @@
 import streamlit as st
-from globals import get_user_plan, show_locked_page
-from auth import verify_token
+from page_gate import require_access
 
 
 # 1) Page config early (avoid duplicate set_page_config later in the file)
 st.set_page_config(page_title="OPTRA", layout="wide", page_icon="optra_logo_transparent.png")
 
 
-# 2) Resolve the user’s email
-# Prefer session (set by Home.py), then token
-decoded = verify_token()  # should read st.query_params["token"] if present
-email_from_token = (decoded or {}).get("email")
-email = st.session_state.get("user_email") or email_from_token
-
-
-# 3) Resolve plan
-plan = get_user_plan(email) if email else None
-
-
-# 4) Access rules
-# Allow Starter + Pro:
-if plan not in ("Starter Plan", "Pro Plan"):
-   # Consistent locked styling + stop
-   show_locked_page("🔒 This page is locked. Please unlock access on the Home page.")
-
-
-# If you want this page to require Pro only, use this instead:
-# if plan != "Pro Plan":
-#     show_locked_page("🔒 Pro plan required. Upgrade to access this page.")
-
-
-# 5) Keep session in sync
-st.session_state["user_email"] = email
-st.session_state["user_plan"]  = plan
-st.session_state["unlocked"]   = True
-
-
-# (Optional) Same gradient for unlocked pages too:
-st.markdown("""
-<style>
- html, body, [data-testid="stAppViewContainer"] {
-     background: linear-gradient(to bottom, #0a0a0a 0%, #0a0a0a 10%, #0d0f1c 30%, #0f111f 60%, #00011d 100%) !important;
-     color: #ffffff !important;
- }
- section[data-testid="stSidebar"] { background-color: #000 !important; }
- section[data-testid="stSidebar"] * { color: #fff !important; }
-</style>
-""", unsafe_allow_html=True)
+# 2) Access gate: Starter + Pro, resolved once per session (see page_gate.py)
+# For a Pro-only page: require_access(allowed_plans=("Pro Plan",), locked_message="🔒 Pro plan required. Upgrade to access this page.")
+require_access()
 
 
 # === Imports & Setup ===
@@ -61,7 +23,8 @@ import pytesseract
 import fitz
 import base64
 from auth import verify_token
-from globals import show_locked_page, get_logo_base64
+from assets import logo_b64
+from globals import show_locked_page
 from feedback import show_feedback_ui, get_past_good_answers
 
 
@@ -74,7 +37,7 @@ st.set_page_config(
 
 
 # === Logo Display ===
-logo_base64 = get_logo_base64()
+logo_base64 = logo_b64(80)
 st.markdown(f"""
    <div style='display:flex;align-items:center;margin-bottom:0.5rem;'>
        <img src='data:image/png;base64,{logo_base64}' width='80' style='margin-right:15px;'/>
@@ -0,0 +1,114 @@
+"""
+Recall / latency benchmark for shortened embedding dimensions.
+
+Embeds a fixed grant corpus (data/grants_data.json + utils/grant_database)
+at each requested dimension into an in-process LocalIndex, then runs a fixed
+query set through vector_store.search_grants (dense only, precomputed query
+vectors so only the search itself is timed). Recall@k is measured against the
+result sets at the largest dimension.
+
+Usage (from the repo root, with OPENAI_API_KEY in .streamlit/secrets.toml):
+    python scripts/bench_embedding_dims.py --dims 256 512 1536 --top-k 5 --repeat 20
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lexical_index import grant_data_documents  # noqa: E402
+from local_index import LocalIndex  # noqa: E402
+from utils.grant_database import get_all_grants  # noqa: E402
+import vector_store  # noqa: E402
+
+
+QUERIES = [
+    "PSG productivity solutions grant for retail point of sale system",
+    "Enterprise Development Grant overseas market expansion",
+    "SkillsFuture Enterprise Credit workforce training",
+    "energy efficiency fund for manufacturing equipment",
+    "Market Readiness Assistance for exporting to Indonesia",
+    "funding for a first-time startup founder",
+    "F&B restaurant digitalisation grant",
+    "trade financing working capital loan",
+    "design innovation for new product development",
+    "local shareholding requirement 30%",
+    "documents needed: ACRA bizfile vendor quotation",
+    "capability building knowledge transfer programme",
+    "green technology sustainability incentive",
+    "IT support for logistics SMEs",
+    "how to submit claims after grant approval",
+]
+
+
+def corpus() -> list[tuple[str, str]]:
+    docs = [(doc_id, text) for doc_id, text, _ in grant_data_documents(vector_store.GRANTS_DATA_PATH)]
+    for i, g in enumerate(get_all_grants()):
+        text = "\n".join([g["name"], g["type"], g["description"], ", ".join(g["sectors"]), ", ".join(g["supported_goals"])])
+        docs.append((f"grantdb_{i}", text))
+    out = []
+    for doc_id, text in docs:
+        for n, chunk in enumerate(vector_store.chunk_text(text, max_tokens=200)):
+            out.append((f"{doc_id}_chunk_{n}", chunk))
+    return out
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    k = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[k]
+
+
+def run_dim(dim: int, docs: list[tuple[str, str]], top_k: int, repeat: int):
+    vector_store.use_embedding_dim(dim)
+    index = LocalIndex(dim)
+    vector_store.use_index(index)
+    vector_store.get_search_cache().clear()
+
+    t0 = time.perf_counter()
+    embeddings = vector_store.embed_texts([text for _, text in docs])
+    index.upsert(vectors=[(doc_id, e) for (doc_id, _), e in zip(docs, embeddings)], namespace="public")
+    ingest_s = time.perf_counter() - t0
+
+    query_vectors = vector_store.embed_texts(QUERIES)
+    results, latencies = {}, []
+    for _ in range(repeat):
+        for q, qv in zip(QUERIES, query_vectors):
+            t0 = time.perf_counter()
+            matches = vector_store.search_grants(q, user_id="bench", top_k=top_k, query_vector=qv, hybrid=False)
+            latencies.append((time.perf_counter() - t0) * 1000)
+            results[q] = [m.id for m in matches]
+    return results, latencies, ingest_s
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dims", type=int, nargs="+", default=[256, 512, 1536])
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    docs = corpus()
+    dims = sorted(set(args.dims), reverse=True)
+    print(f"Corpus: {len(docs)} chunks, {len(QUERIES)} queries, top_k={args.top_k}, reference dim={dims[0]}")
+
+    reference = None
+    print(f"{'dim':>6} {'recall@k':>9} {'p50 ms':>8} {'p95 ms':>8} {'ingest s':>9} {'bytes/vec':>10}")
+    for dim in dims:
+        results, latencies, ingest_s = run_dim(dim, docs, args.top_k, args.repeat)
+        if reference is None:
+            reference = results
+        recall = statistics.mean(
+            len(set(results[q]) & set(reference[q])) / max(1, len(reference[q])) for q in QUERIES
+        )
+        print(f"{dim:>6} {recall:>9.3f} {_percentile(latencies, 50):>8.3f} {_percentile(latencies, 95):>8.3f} "
+              f"{ingest_s:>9.2f} {dim * 4:>10}")
+
+    vector_store.use_index(None)
+    vector_store.use_embedding_dim(None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Throughput / retrieval-quality benchmark for embedding providers.
+
+Embeds the fixed grant corpus and query set from bench_embedding_dims.py with
+each provider, then reports:
+  - corpus throughput (texts/s, batched) and single-query embed latency
+    (p50/p95, the cost paid on every search),
+  - recall@k and MRR of each provider's dense results against the
+    text-embedding-3-small reference (1536d).
+Nothing goes through the embedding cache, so every number is a cold embed.
+
+Providers: "openai" (the reference), "hashing", and "sentence-transformers"
+when that package is installed. Extra settings use provider:key=value, e.g.
+    hashing:dim=2048   sentence-transformers:backend=onnx
+
+Usage (from the repo root, with OPENAI_API_KEY in .streamlit/secrets.toml):
+    python scripts/bench_embedding_providers.py --providers hashing sentence-transformers --threads 4
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_embedding_dims import QUERIES, _percentile, corpus  # noqa: E402
+from embedding_providers import make_provider  # noqa: E402
+from local_index import LocalIndex  # noqa: E402
+import vector_store  # noqa: E402
+
+
+def parse_spec(arg: str, threads, batch_size) -> dict:
+    provider, _, rest = arg.partition(":")
+    spec = {"provider": provider}
+    for pair in filter(None, rest.split(",")):
+        key, _, value = pair.partition("=")
+        spec[key] = int(value) if value.isdigit() else value
+    if provider == "sentence-transformers":
+        spec.setdefault("threads", threads)
+        spec.setdefault("batch_size", batch_size)
+    return spec
+
+
+def run_provider(provider, docs, top_k: int, batch_size: int, repeat: int):
+    texts = [text for _, text in docs]
+    t0 = time.perf_counter()
+    embeddings = []
+    for i in range(0, len(texts), batch_size):
+        embeddings.extend(provider.embed(texts[i:i + batch_size]))
+    corpus_s = time.perf_counter() - t0
+
+    latencies, query_vectors = [], []
+    for _ in range(repeat):
+        query_vectors = []
+        for q in QUERIES:
+            t0 = time.perf_counter()
+            query_vectors.append(provider.embed([q])[0])
+            latencies.append((time.perf_counter() - t0) * 1000)
+
+    index = LocalIndex(provider.dimension)
+    index.upsert(vectors=[(doc_id, e) for (doc_id, _), e in zip(docs, embeddings)], namespace="public")
+    results = {
+        q: [m.id for m in index.query(vector=v, top_k=top_k, namespace="public").matches]
+        for q, v in zip(QUERIES, query_vectors)
+    }
+    return results, len(texts) / corpus_s, latencies
+
+
+def _mrr(results, reference):
+    scores = []
+    for q, ref in reference.items():
+        top = ref[0] if ref else None
+        ranked = results[q]
+        scores.append(1 / (ranked.index(top) + 1) if top in ranked else 0.0)
+    return statistics.mean(scores)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--providers", nargs="+", default=["hashing", "sentence-transformers"])
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--threads", type=int, default=None, help="CPU threads for model-backed providers")
+    parser.add_argument("--repeat", type=int, default=3, help="Passes over the query set for latency")
+    args = parser.parse_args()
+
+    docs = corpus()
+    specs = [{"provider": "openai", "dim": vector_store.NATIVE_EMBEDDING_DIM}]
+    specs += [parse_spec(p, args.threads, args.batch_size) for p in args.providers]
+    print(f"Corpus: {len(docs)} chunks, {len(QUERIES)} queries, top_k={args.top_k}, "
+          f"batch={args.batch_size}, threads={args.threads or 'default'}")
+
+    reference = None
+    print(f"{'provider':<34} {'dim':>5} {'texts/s':>9} {'q p50 ms':>9} {'q p95 ms':>9} {'recall@k':>9} {'MRR':>6}")
+    for spec in specs:
+        try:
+            provider = make_provider(spec, vector_store.get_openai_client, vector_store.EMBEDDING_MODEL,
+                                     vector_store.NATIVE_EMBEDDING_DIM)
+        except RuntimeError as e:
+            print(f"{spec['provider']:<34} skipped: {e}")
+            continue
+        results, throughput, latencies = run_provider(provider, docs, args.top_k, args.batch_size, args.repeat)
+        if reference is None:
+            reference = results
+        recall = statistics.mean(
+            len(set(results[q]) & set(reference[q])) / max(1, len(reference[q])) for q in QUERIES
+        )
+        print(f"{provider.name:<34} {provider.dimension:>5} {throughput:>9.1f} {_percentile(latencies, 50):>9.2f} "
+              f"{_percentile(latencies, 95):>9.2f} {recall:>9.3f} {_mrr(results, reference):>6.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Apply the ai_response retention policy to every user namespace.
+
+For each user_* namespace (or the ones given with --user) this drops answers
+past --max-age-days, keeps the latest answer per question, merges
+near-duplicates and caps the count per user, then prints namespace sizes
+before and after.
+
+Usage (from the repo root):
+    python scripts/compact_ai_responses.py --dry-run
+    python scripts/compact_ai_responses.py --max-age-days 90 --max-count 200
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import vector_store  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--user", action="append", help="Only compact this user id (repeatable)")
+    parser.add_argument("--max-age-days", type=float, default=vector_store.AI_RESPONSE_MAX_AGE_DAYS)
+    parser.add_argument("--max-count", type=int, default=vector_store.AI_RESPONSE_MAX_PER_USER)
+    parser.add_argument("--similarity", type=float, default=vector_store.AI_RESPONSE_DUPLICATE_SIMILARITY,
+                        help="Cosine similarity at or above which answers are merged")
+    parser.add_argument("--dry-run", action="store_true", help="Report what would be removed without deleting")
+    args = parser.parse_args()
+
+    if args.user:
+        users = args.user
+    else:
+        users = [ns[len("user_"):] for ns in vector_store.namespace_sizes() if ns.startswith("user_")]
+
+    total_before = total_after = 0
+    print(f"{'namespace':<40} {'size before':>11} {'size after':>10}  removed")
+    for user_id in sorted(users):
+        report = vector_store.compact_ai_responses(
+            user_id,
+            max_age_days=args.max_age_days,
+            max_count=args.max_count,
+            duplicate_similarity=args.similarity,
+            dry_run=args.dry_run,
+        )
+        total_before += report["namespace_size_before"]
+        total_after += report["namespace_size_after"]
+        removed = ", ".join(f"{k}={v}" for k, v in report["deleted"].items() if v)
+        print(f"{report['namespace']:<40} {report['namespace_size_before']:>11} "
+              f"{report['namespace_size_after']:>10}  {removed or '-'}")
+    print(f"{'total':<40} {total_before:>11} {total_after:>10}{'  (dry run)' if args.dry_run else ''}")
+
+
+if __name__ == "__main__":
+    main()
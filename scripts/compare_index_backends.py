@@ -0,0 +1,90 @@
+"""
+Compare the in-process LocalIndex against the hosted Pinecone index.
+
+Copies one namespace from Pinecone into a LocalIndex, then replays queries
+(stored vectors, lightly perturbed) against both and reports recall@k of the
+local results versus Pinecone plus p50/p95 query latency for each backend.
+
+Usage (from the repo root, with .streamlit/secrets.toml in place):
+    python scripts/compare_index_backends.py --namespace public --queries 100 --top-k 5
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from local_index import LocalIndex  # noqa: E402
+import vector_store  # noqa: E402
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    k = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[k]
+
+
+def mirror_namespace(hosted, local, namespace: str, batch: int = 100):
+    """Copy every vector of a hosted namespace into the local index. Returns the ids copied."""
+    ids = []
+    for page in hosted.list(namespace=namespace):
+        ids.extend(page)
+    for i in range(0, len(ids), batch):
+        fetched = hosted.fetch(ids=ids[i:i + batch], namespace=namespace).vectors
+        local.upsert(
+            vectors=[(vid, v.values, v.metadata) for vid, v in fetched.items()],
+            namespace=namespace,
+        )
+    return ids
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--namespace", default="public")
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--noise", type=float, default=0.01, help="Gaussian noise added to each query vector")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    hosted = vector_store.get_pinecone().Index(vector_store.get_index_name(args.namespace))
+    local = LocalIndex(vector_store.get_embedding_dim(args.namespace))
+
+    t0 = time.perf_counter()
+    ids = mirror_namespace(hosted, local, args.namespace)
+    print(f"Mirrored {len(ids)} vectors from '{args.namespace}' in {time.perf_counter() - t0:.1f}s")
+    if not ids:
+        return
+
+    sample = rng.sample(ids, min(args.queries, len(ids)))
+    seeds = local.fetch(ids=sample, namespace=args.namespace).vectors
+
+    recalls, hosted_ms, local_ms = [], [], []
+    for vid in sample:
+        q = [x + rng.gauss(0, args.noise) for x in seeds[vid].values]
+
+        t0 = time.perf_counter()
+        h = hosted.query(vector=q, top_k=args.top_k, namespace=args.namespace).matches
+        hosted_ms.append((time.perf_counter() - t0) * 1000)
+
+        t0 = time.perf_counter()
+        l = local.query(vector=q, top_k=args.top_k, namespace=args.namespace).matches
+        local_ms.append((time.perf_counter() - t0) * 1000)
+
+        truth = {m.id for m in h}
+        if truth:
+            recalls.append(len(truth & {m.id for m in l}) / len(truth))
+
+    print(f"recall@{args.top_k} (local vs hosted): {statistics.mean(recalls):.3f}")
+    for name, ms in (("hosted", hosted_ms), ("local", local_ms)):
+        print(f"{name:>6}: p50={_percentile(ms, 50):.2f}ms  p95={_percentile(ms, 95):.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+"""
+Bulk (re-)seed the shared `public` namespace.
+
+Sources: data/grants_data.json, utils.grant_database.get_all_grants() and,
+with --docs-dir, every PDF / HTML file under a folder of official documents.
+Each document goes through vector_store.add_public_document (chunk_text ->
+batched embedding -> paged upsert, incremental on its doc_key) on a worker
+pool, with a progress line per document and a throughput summary at the end.
+
+Finished documents are recorded in a JSON checkpoint together with a hash of
+their content, so an interrupted run picks up where it stopped and unchanged
+documents are skipped on the next run. The checkpoint is also tied to the
+backend / index / embedding provider: after switching EMBEDDING_MODEL,
+EMBEDDING_DIM or the public namespace's provider the next run re-embeds
+everything without any extra flags.
+
+Usage (from the repo root, with .streamlit/secrets.toml in place):
+    python scripts/ingest_public_corpus.py --docs-dir data/official_docs --workers 4
+    python scripts/ingest_public_corpus.py --reembed          # force a full re-embed
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lexical_index import grant_data_documents, grant_database_documents  # noqa: E402
+from utils.grant_database import get_all_grants  # noqa: E402
+import vector_store  # noqa: E402
+
+
+DEFAULT_CHECKPOINT = ".optra_cache/public_ingest.json"
+FILE_TYPES = {".pdf": "pdf", ".html": "html", ".htm": "html"}
+
+
+# ---------- sources ----------
+def _text_source(doc_key, text, metadata):
+    return {"doc_key": doc_key, "metadata": metadata, "fingerprint": _sha(text.encode("utf-8")), "load": lambda: text}
+
+
+def _file_source(path, root):
+    kind = FILE_TYPES[os.path.splitext(path)[1].lower()]
+    rel = os.path.relpath(path, root)
+    with open(path, "rb") as f:
+        fingerprint = _sha(f.read())
+    loader = _read_pdf if kind == "pdf" else _read_html
+    return {
+        "doc_key": "officialdoc_" + re.sub(r"[^a-z0-9]+", "_", rel.lower()).strip("_"),
+        "metadata": {"type": "official_doc", "source": rel, "format": kind},
+        "fingerprint": fingerprint,
+        "load": lambda: loader(path),
+    }
+
+
+def _read_pdf(path) -> str:
+    import pdfplumber
+    with pdfplumber.open(path) as pdf:
+        return "\n".join(page.extract_text() or "" for page in pdf.pages)
+
+
+def _read_html(path) -> str:
+    from bs4 import BeautifulSoup
+    with open(path, "rb") as f:
+        soup = BeautifulSoup(f.read(), "html.parser")
+    for tag in soup(["script", "style", "nav", "footer"]):
+        tag.decompose()
+    return "\n".join(line.strip() for line in soup.get_text("\n").splitlines() if line.strip())
+
+
+def collect_sources(grants_path, docs_dir, skip_grant_db=False):
+    sources = []
+    if grants_path:
+        sources += [_text_source(*doc) for doc in grant_data_documents(grants_path)]
+    if not skip_grant_db:
+        sources += [_text_source(*doc) for doc in grant_database_documents(get_all_grants())]
+    if docs_dir:
+        for dirpath, _, filenames in os.walk(docs_dir):
+            for name in sorted(filenames):
+                if os.path.splitext(name)[1].lower() in FILE_TYPES:
+                    sources.append(_file_source(os.path.join(dirpath, name), docs_dir))
+    return sources
+
+
+def _sha(raw: bytes) -> str:
+    return hashlib.sha256(raw).hexdigest()
+
+
+# ---------- checkpoint ----------
+class CorpusCheckpoint:
+    """{doc_key: fingerprint} of documents fully ingested under the current scope, saved atomically."""
+
+    def __init__(self, path: str, scope: str):
+        self.path = path
+        self.scope = scope
+        self._lock = threading.Lock()
+        self.done = {}
+        self.scope_changed = False
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+            if state.get("scope") == scope:
+                self.done = state.get("done", {})
+            else:
+                self.scope_changed = True
+
+    def is_done(self, source) -> bool:
+        return self.done.get(source["doc_key"]) == source["fingerprint"]
+
+    def mark(self, source):
+        with self._lock:
+            self.done[source["doc_key"]] = source["fingerprint"]
+            self._save()
+
+    def reset(self):
+        with self._lock:
+            self.done = {}
+            self._save()
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"scope": self.scope, "done": self.done}, f)
+        os.replace(tmp, self.path)
+
+
+# ---------- run ----------
+def ingest_one(source):
+    t0 = time.perf_counter()
+    text = source["load"]()
+    if not text.strip():
+        return {"chunks": 0, "added": 0, "seconds": time.perf_counter() - t0, "empty": True}
+    stats = vector_store.add_public_document(
+        text, doc_id_prefix=source["doc_key"], metadata=source["metadata"], doc_key=source["doc_key"]
+    )
+    return {
+        "chunks": len(stats["chunk_ids"]),
+        "added": stats["added"],
+        "seconds": time.perf_counter() - t0,
+        "empty": False,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--grants-json", default=vector_store.GRANTS_DATA_PATH,
+                        help="Path to grants_data.json ('' to skip)")
+    parser.add_argument("--skip-grant-db", action="store_true", help="Skip utils.grant_database")
+    parser.add_argument("--docs-dir", help="Folder of official PDF / HTML documents (searched recursively)")
+    parser.add_argument("--workers", type=int, default=4, help="Documents ingested concurrently")
+    parser.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT)
+    parser.add_argument("--reembed", action="store_true",
+                        help="Ignore the checkpoint and manifests and re-embed every document")
+    parser.add_argument("--dry-run", action="store_true", help="List what would be ingested and exit")
+    args = parser.parse_args()
+
+    scope = (f"{vector_store.get_vector_backend()}:{vector_store.get_index_name('public')}:"
+             f"{vector_store.get_embedding_provider('public').name}")
+    checkpoint = CorpusCheckpoint(args.checkpoint, scope)
+    reembed = args.reembed or checkpoint.scope_changed
+    sources = collect_sources(args.grants_json or None, args.docs_dir, args.skip_grant_db)
+    if reembed:
+        pending = sources
+    else:
+        pending = [s for s in sources if not checkpoint.is_done(s)]
+    print(f"{len(sources)} documents, {len(sources) - len(pending)} already ingested, {len(pending)} to go "
+          f"({scope}{', re-embedding' if reembed else ''})")
+    if args.dry_run or not pending:
+        for s in pending:
+            print(f"  {s['doc_key']}")
+        return
+
+    if reembed:
+        # Manifests would otherwise report unchanged chunks and skip the embedding call
+        vector_store.forget_manifests("public")
+        checkpoint.reset()
+
+    total_chunks = total_added = failed = 0
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, args.workers)) as pool:
+        futures = {pool.submit(ingest_one, s): s for s in pending}
+        for n, future in enumerate(as_completed(futures), 1):
+            source = futures[future]
+            elapsed = time.perf_counter() - started
+            try:
+                result = future.result()
+            except Exception as e:
+                failed += 1
+                print(f"[{n}/{len(pending)}] FAILED {source['doc_key']}: {e}")
+                continue
+            checkpoint.mark(source)
+            total_chunks += result["chunks"]
+            total_added += result["added"]
+            note = "empty" if result["empty"] else f"{result['chunks']} chunks, {result['added']} embedded"
+            print(f"[{n}/{len(pending)}] {source['doc_key']}: {note} in {result['seconds']:.1f}s "
+                  f"| {n / elapsed:.2f} docs/s, {total_added / elapsed:.1f} chunks/s")
+
+    elapsed = time.perf_counter() - started
+    print(f"Done in {elapsed:.1f}s: {len(pending) - failed} documents, {total_chunks} chunks "
+          f"({total_added} embedded), {failed} failed")
+    if failed:
+        print("Re-run the same command to retry the failed documents.")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+-- 001_subscription_lookup.sql
+-- Single round-trip plan lookup used by globals.get_user_plan.
+--
+-- Adds indexed, normalized (trimmed + lower-cased) email columns to subscriptions and
+-- profiles, and a subscriptions_for_email(p_email) function that returns the matching
+-- subscriptions rows, falling back to profiles -> user_id when no row carries the email.
+--
+-- The coalesce() below lists the email columns globals.EMAIL_COLUMNS_DEFAULT tries;
+-- drop any your subscriptions table doesn't have before running this in the SQL editor.
+-- After running it, optionally set in secrets.toml:
+--   [SUPABASE_SUBSCRIPTIONS]
+--   NORMALIZED_EMAIL_FIELD = "email_normalized"
+
+alter table public.subscriptions
+  add column if not exists email_normalized text
+  generated always as (lower(btrim(coalesce(email, customer_email, user_email, billing_email)))) stored;
+
+create index if not exists subscriptions_email_normalized_idx
+  on public.subscriptions (email_normalized);
+
+create index if not exists subscriptions_user_id_idx
+  on public.subscriptions (user_id);
+
+alter table public.profiles
+  add column if not exists email_normalized text
+  generated always as (lower(btrim(email))) stored;
+
+create index if not exists profiles_email_normalized_idx
+  on public.profiles (email_normalized);
+
+create or replace function public.subscriptions_for_email(p_email text)
+returns setof public.subscriptions
+language sql
+stable
+as $$
+  with direct as (
+    select s.*
+    from public.subscriptions s
+    where s.email_normalized = lower(btrim(p_email))
+    limit 10
+  )
+  select * from direct
+  union all
+  select s.*
+  from public.profiles p
+  join public.subscriptions s on s.user_id = coalesce(p.user_id, p.id)
+  where p.email_normalized = lower(btrim(p_email))
+    and not exists (select 1 from direct)
+  limit 10;
+$$;
+
+grant execute on function public.subscriptions_for_email(text) to service_role;
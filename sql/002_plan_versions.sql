@@ -0,0 +1,70 @@
+-- 002_plan_versions.sql
+-- Revocation / plan-version list read by auth.RevocationList.
+--
+-- Session tokens carry the plan and the email's plan_version at issue time. A token is
+-- rejected once plan_version moves past it or when it was issued before revoked_before.
+-- The app keeps this table in memory and refreshes it every minute, so page renders
+-- never query it.
+
+create table if not exists public.plan_versions (
+  email          text primary key,           -- trimmed, lower-cased
+  plan_version   integer not null default 0,
+  revoked_before timestamptz,
+  updated_at     timestamptz not null default now()
+);
+
+create index if not exists plan_versions_updated_at_idx on public.plan_versions (updated_at);
+
+create or replace function public.plan_versions_touch()
+returns trigger language plpgsql as $$
+begin
+  new.updated_at := now();
+  return new;
+end;
+$$;
+
+drop trigger if exists plan_versions_touch on public.plan_versions;
+create trigger plan_versions_touch
+  before insert or update on public.plan_versions
+  for each row execute function public.plan_versions_touch();
+
+-- Any change to a subscription row that can change the resolved plan bumps the plan
+-- version, so tokens minted under the old plan stop authorizing without the app having
+-- to be told: plan / status updates, deletes, and inserts (a newer row, e.g. a cancelled
+-- one, is what globals._pick_latest resolves to). An email change bumps both emails.
+-- plan / status are the default column names (globals.PLAN_COLUMNS_DEFAULT etc.); adjust to your schema.
+-- Uses subscriptions.email_normalized from 001_subscription_lookup.sql.
+create or replace function public.plan_versions_bump(p_email text)
+returns void language sql as $$
+  insert into public.plan_versions (email, plan_version)
+  values (p_email, 1)
+  on conflict (email) do update set plan_version = public.plan_versions.plan_version + 1;
+$$;
+
+create or replace function public.subscriptions_bump_plan_version()
+returns trigger language plpgsql as $$
+begin
+  if tg_op = 'UPDATE'
+     and old.plan is not distinct from new.plan
+     and old.status is not distinct from new.status
+     and old.email_normalized is not distinct from new.email_normalized then
+    return null;
+  end if;
+  if tg_op in ('INSERT', 'UPDATE') and new.email_normalized is not null then
+    perform public.plan_versions_bump(new.email_normalized);
+  end if;
+  if tg_op = 'DELETE'
+     or (tg_op = 'UPDATE' and old.email_normalized is distinct from new.email_normalized) then
+    if old.email_normalized is not null then
+      perform public.plan_versions_bump(old.email_normalized);
+    end if;
+  end if;
+  return null;
+end;
+$$;
+
+drop trigger if exists subscriptions_bump_plan_version on public.subscriptions;
+create trigger subscriptions_bump_plan_version
+  after insert or update or delete on public.subscriptions
+  for each row
+  execute function public.subscriptions_bump_plan_version();
@@ -0,0 +1,127 @@
+# supabase_client.py
+import threading
+import time
+from typing import Optional
+from urllib.parse import urlparse
+
+import httpx
+import streamlit as st
+from supabase import Client, ClientOptions, create_client
+
+
+# ==========================================================
+# ✅ Settings
+# ==========================================================
+SUPABASE_TIMEOUT_SECONDS         = 10.0  # read/write/pool
+SUPABASE_CONNECT_TIMEOUT_SECONDS = 5.0
+SUPABASE_MAX_CONNECTIONS         = 20    # shared by every session in the process
+SUPABASE_MAX_KEEPALIVE           = 10
+SUPABASE_KEEPALIVE_EXPIRY        = 60.0  # seconds an idle connection is kept open
+
+
+def _credentials() -> tuple[str, str]:
+    """Nested [SUPABASE] secrets, falling back to the flat SUPABASE_URL / SUPABASE_SERVICE_ROLE_KEY layout."""
+    nested = st.secrets.get("SUPABASE", {})
+    url = nested.get("URL") or st.secrets.get("SUPABASE_URL")
+    key = nested.get("SERVICE_ROLE_KEY") or st.secrets.get("SUPABASE_SERVICE_ROLE_KEY")
+    if not url or not key:
+        raise KeyError("Supabase credentials missing: set [SUPABASE] URL and SERVICE_ROLE_KEY in secrets.toml")
+    return url, key
+
+
+# ==========================================================
+# ✅ Per-table latency counters (fed by httpx event hooks)
+# ==========================================================
+class TableLatency:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats: dict[str, dict] = {}
+
+    @staticmethod
+    def table_for(url) -> str:
+        # /rest/v1/<table> or /rest/v1/rpc/<function>
+        parts = [p for p in urlparse(str(url)).path.split("/") if p]
+        if len(parts) >= 3 and parts[:2] == ["rest", "v1"]:
+            return f"rpc:{parts[3]}" if parts[2] == "rpc" and len(parts) > 3 else parts[2]
+        return "/".join(parts[:2]) or "/"
+
+    def record(self, table: str, method: str, ms: float, error: bool):
+        with self._lock:
+            s = self._stats.setdefault(table, {"calls": 0, "errors": 0, "total_ms": 0.0, "max_ms": 0.0, "methods": {}})
+            s["calls"] += 1
+            s["errors"] += int(error)
+            s["total_ms"] += ms
+            s["max_ms"] = max(s["max_ms"], ms)
+            s["methods"][method] = s["methods"].get(method, 0) + 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                table: {**s, "methods": dict(s["methods"]), "avg_ms": round(s["total_ms"] / s["calls"], 2)}
+                for table, s in self._stats.items()
+            }
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+
+@st.cache_resource(show_spinner=False)
+def _get_latency() -> TableLatency:
+    return TableLatency()
+
+
+def _build_http_client(latency: TableLatency) -> httpx.Client:
+    def on_request(request: httpx.Request):
+        request.extensions["optra_t0"] = time.perf_counter()
+
+    def on_response(response: httpx.Response):
+        t0 = response.request.extensions.get("optra_t0")
+        if t0 is not None:
+            latency.record(
+                TableLatency.table_for(response.request.url),
+                response.request.method,
+                (time.perf_counter() - t0) * 1000,
+                response.status_code >= 400,
+            )
+
+    return httpx.Client(
+        timeout=httpx.Timeout(SUPABASE_TIMEOUT_SECONDS, connect=SUPABASE_CONNECT_TIMEOUT_SECONDS),
+        limits=httpx.Limits(
+            max_connections=SUPABASE_MAX_CONNECTIONS,
+            max_keepalive_connections=SUPABASE_MAX_KEEPALIVE,
+            keepalive_expiry=SUPABASE_KEEPALIVE_EXPIRY,
+        ),
+        event_hooks={"request": [on_request], "response": [on_response]},
+    )
+
+
+# ==========================================================
+# ✅ Shared client
+# ==========================================================
+@st.cache_resource(show_spinner=False)
+def get_supabase() -> Client:
+    """
+    The one Supabase client for this process (service role key), built on first use.
+    Requests share a single keep-alive httpx connection pool with bounded size and
+    timeouts, and every PostgREST call is timed per table (see supabase_latency_stats).
+    """
+    url, key = _credentials()
+    http = _build_http_client(_get_latency())
+    try:
+        options = ClientOptions(httpx_client=http, postgrest_client_timeout=SUPABASE_TIMEOUT_SECONDS)
+    except TypeError:
+        # supabase-py releases without httpx_client: keep the timeout, lose pooling/counters
+        http.close()
+        options = ClientOptions(postgrest_client_timeout=SUPABASE_TIMEOUT_SECONDS)
+    return create_client(url, key, options=options)
+
+
+def supabase_latency_stats(table: Optional[str] = None) -> dict:
+    """{table: {calls, errors, avg_ms, max_ms, total_ms, methods}} since process start (or reset)."""
+    stats = _get_latency().snapshot()
+    return stats.get(table, {}) if table else stats
+
+
+def reset_supabase_latency_stats():
+    _get_latency().reset()
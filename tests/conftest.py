@@ -0,0 +1,50 @@
+# tests/conftest.py
+import hashlib
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import streamlit as st  # noqa: E402
+import vector_store as vs  # noqa: E402
+from local_index import LocalIndex  # noqa: E402
+
+TEST_DIM = 32
+
+
+def fake_embed(texts, *_, **__):
+    """Deterministic pseudo-embeddings: the same text always gets the same vector."""
+    out = []
+    for text in texts:
+        seed = int(hashlib.md5(text.encode("utf-8")).hexdigest()[:8], 16)
+        out.append(np.random.default_rng(seed).normal(size=TEST_DIM).tolist())
+    return out
+
+
+class WordEncoder:
+    """tiktoken stand-in: one token per whitespace-separated word."""
+
+    def encode(self, text):
+        return text.split()
+
+    def decode(self, tokens):
+        return " ".join(tokens)
+
+
+@pytest.fixture
+def local_store(tmp_path, monkeypatch):
+    """vector_store wired to an in-memory LocalIndex, fake embeddings and caches under tmp_path."""
+    monkeypatch.chdir(tmp_path)
+    st.cache_resource.clear()
+    monkeypatch.setattr(vs, "_embed_uncached", fake_embed)
+    monkeypatch.setattr(vs, "_get_encoder", WordEncoder)
+    index = LocalIndex(TEST_DIM)
+    vs.use_embedding_dim(TEST_DIM)
+    vs.use_index(index)
+    yield index
+    vs.use_index(None)
+    vs.use_embedding_dim(None)
+    st.cache_resource.clear()
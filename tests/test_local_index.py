@@ -0,0 +1,108 @@
+# tests/test_local_index.py
+import numpy as np
+import pytest
+
+from local_index import LocalIndex
+
+DIM = 16
+
+
+@pytest.fixture
+def vectors():
+    return np.random.default_rng(0).normal(size=(400, DIM)).astype(np.float32)
+
+
+def _ids(response):
+    return [m.id for m in response.matches]
+
+
+def _fill(index, vectors, namespace="ns"):
+    index.upsert(vectors=[(f"v{i}", v, {"group": i % 3}) for i, v in enumerate(vectors)], namespace=namespace)
+
+
+def test_upsert_and_query_returns_nearest(vectors):
+    index = LocalIndex(DIM)
+    _fill(index, vectors)
+    res = index.query(vector=vectors[7], top_k=3, include_metadata=True, namespace="ns")
+    assert res.matches[0].id == "v7"
+    assert res.matches[0].score == pytest.approx(1.0, abs=1e-5)
+    assert res.matches[0].metadata == {"group": 1}
+    assert index.describe_index_stats()["namespaces"]["ns"]["vector_count"] == len(vectors)
+
+
+def test_upsert_overwrites_existing_id(vectors):
+    index = LocalIndex(DIM)
+    _fill(index, vectors)
+    index.upsert(vectors=[("v1", vectors[2], {"group": 9})], namespace="ns")
+    fetched = index.fetch(["v1"], namespace="ns").vectors["v1"]
+    assert np.allclose(fetched.values, vectors[2])
+    assert fetched.metadata == {"group": 9}
+    assert index.describe_index_stats()["total_vector_count"] == len(vectors)
+
+
+def test_query_filter(vectors):
+    index = LocalIndex(DIM)
+    _fill(index, vectors)
+    res = index.query(vector=vectors[0], top_k=10, include_metadata=True, namespace="ns", filter={"group": 2})
+    assert len(res.matches) == 10
+    assert all(m.metadata["group"] == 2 for m in res.matches)
+
+
+def test_delete_by_id_and_filter(vectors):
+    index = LocalIndex(DIM)
+    _fill(index, vectors)
+    index.delete(ids=["v7"], namespace="ns")
+    assert "v7" not in _ids(index.query(vector=vectors[7], top_k=5, namespace="ns"))
+    index.delete(filter={"group": 0}, namespace="ns")
+    remaining = [vid for page in index.list(namespace="ns") for vid in page]
+    assert len(remaining) == len(vectors) - 1 - len(range(0, len(vectors), 3))
+    assert all(int(vid[1:]) % 3 for vid in remaining)
+
+
+def test_delete_keeps_ivf_until_threshold(vectors):
+    index = LocalIndex(DIM, ann_threshold=100, n_probe=1000)
+    _fill(index, vectors)
+    index.query(vector=vectors[0], top_k=1, namespace="ns")
+    ns = index._namespaces["ns"]
+    centroids = ns.centroids
+    assert centroids is not None
+
+    index.delete(ids=["v3", "v4"], namespace="ns")
+    assert ns.centroids is centroids  # tombstoned, not rebuilt
+    res = index.query(vector=vectors[3], top_k=5, namespace="ns")
+    assert "v3" not in _ids(res)
+    assert index.describe_index_stats()["namespaces"]["ns"]["vector_count"] == len(vectors) - 2
+    assert not any(vid in ("v3", "v4") for page in index.list(namespace="ns") for vid in page)
+
+    # Re-adding a deleted id makes it retrievable again
+    index.upsert(vectors=[("v3", vectors[3], {"group": 0})], namespace="ns")
+    assert _ids(index.query(vector=vectors[3], top_k=1, namespace="ns")) == ["v3"]
+
+    # Past a tenth of the indexed rows the namespace is compacted and the IVF dropped
+    index.delete(ids=[f"v{i}" for i in range(100, 150)], namespace="ns")
+    assert ns.centroids is None and ns.n_dead == 0
+    assert index.describe_index_stats()["namespaces"]["ns"]["vector_count"] == len(vectors) - 51
+    assert _ids(index.query(vector=vectors[200], top_k=1, namespace="ns")) == ["v200"]
+
+
+def test_persist_and_reload(tmp_path, vectors):
+    index = LocalIndex(DIM, path=str(tmp_path), ann_threshold=100)
+    _fill(index, vectors)
+    index.query(vector=vectors[0], top_k=1, namespace="ns")
+    index.delete(ids=["v5"], namespace="ns")  # tombstoned rows are not written
+    index.flush()
+
+    reloaded = LocalIndex(DIM, path=str(tmp_path))
+    assert reloaded.describe_index_stats()["namespaces"]["ns"]["vector_count"] == len(vectors) - 1
+    assert reloaded.fetch(["v5"], namespace="ns").vectors == {}
+    fetched = reloaded.fetch(["v6"], namespace="ns").vectors["v6"]
+    assert np.allclose(fetched.values, vectors[6])
+    assert fetched.metadata == {"group": 0}
+
+
+def test_delete_all_removes_namespace(tmp_path, vectors):
+    index = LocalIndex(DIM, path=str(tmp_path), save_interval=0)
+    _fill(index, vectors)
+    index.delete(delete_all=True, namespace="ns")
+    assert index.query(vector=vectors[0], top_k=1, namespace="ns").matches == []
+    assert LocalIndex(DIM, path=str(tmp_path)).describe_index_stats()["total_vector_count"] == 0
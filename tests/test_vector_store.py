@@ -0,0 +1,105 @@
+# tests/test_vector_store.py
+import vector_store as vs
+
+
+def _document(n_paragraphs=12, words=40):
+    paragraphs = []
+    for p in range(n_paragraphs):
+        sentences = [" ".join(f"p{p}s{s}w{w}" for w in range(words // 4)) + "." for s in range(4)]
+        paragraphs.append(" ".join(sentences))
+    return "\n\n".join(paragraphs)
+
+
+# ---------- chunk_text ----------
+def test_chunk_text_respects_max_tokens(local_store):
+    text = _document()
+    chunks = vs.chunk_text(text, max_tokens=60)
+    assert len(chunks) > 1
+    assert all(len(c.split()) <= 60 for c in chunks)
+    assert " ".join(" ".join(chunks).split()) == " ".join(text.split())
+
+
+def test_chunk_text_splits_run_on_sentences(local_store):
+    chunks = vs.chunk_text(" ".join(f"w{i}" for i in range(250)), max_tokens=100)
+    assert [len(c.split()) for c in chunks] == [100, 100, 50]
+
+
+def test_chunk_text_edit_leaves_later_chunks_unchanged(local_store):
+    text = _document()
+    before = vs.chunk_text(text, max_tokens=60)
+    after = vs.chunk_text("A brand new opening sentence.\n\n" + text, max_tokens=60)
+    assert len(set(before) & set(after)) >= len(before) - 2
+
+
+def test_chunk_text_empty(local_store):
+    assert vs.chunk_text("") == []
+
+
+# ---------- _upsert_chunks ----------
+def test_upsert_chunks_counts(local_store):
+    text = _document(n_paragraphs=60)
+    first = vs.add_document(text, "doc", {"source": "a"}, user_id="u1", doc_key="doc.pdf")
+    assert first["added"] == len(first["chunk_ids"]) > 1
+    assert first["unchanged"] == first["updated"] == first["removed"] == 0
+    stats = local_store.describe_index_stats()["namespaces"]["user_u1"]
+    assert stats["vector_count"] == first["added"]
+
+    again = vs.add_document(text, "doc", {"source": "a"}, user_id="u1", doc_key="doc.pdf")
+    assert again["added"] == again["updated"] == again["removed"] == 0
+    assert again["unchanged"] == len(first["chunk_ids"])
+
+    # Dropping the last paragraphs removes their chunks and keeps the rest
+    shorter = "\n\n".join(text.split("\n\n")[:30])
+    edited = vs.add_document(shorter, "doc", {"source": "a"}, user_id="u1", doc_key="doc.pdf")
+    assert edited["removed"] > 0
+    assert edited["added"] + edited["updated"] + edited["unchanged"] == len(edited["chunk_ids"])
+    assert edited["unchanged"] > 0
+    listed = {vid for page in local_store.list(namespace="user_u1") for vid in page}
+    assert listed == set(edited["chunk_ids"])
+
+
+def test_upsert_chunks_metadata_change_updates_in_place(local_store):
+    text = _document(n_paragraphs=4)
+    first = vs.add_document(text, "doc", {"source": "a"}, user_id="u1", doc_key="doc.pdf")
+    second = vs.add_document(text, "doc", {"source": "b"}, user_id="u1", doc_key="doc.pdf")
+    assert second["added"] == second["removed"] == 0
+    assert second["updated"] == len(first["chunk_ids"])
+    fetched = local_store.fetch(first["chunk_ids"][:1], namespace="user_u1").vectors
+    assert fetched[first["chunk_ids"][0]].metadata["source"] == "b"
+
+
+# ---------- search cache ----------
+def test_invalidate_search_cache_drops_namespace_entries(local_store):
+    cache = vs.get_search_cache()
+    cache.set(("user_u1", "q", 5, False, True), ["a"])
+    cache.set(("user_u2", "q", 5, False, True), ["b"])
+    cache.set(("user_u2", "q", 5, True, True), ["c"])
+    vs.invalidate_search_cache("user_u1")
+    assert cache.get(("user_u1", "q", 5, False, True)) is None
+    assert cache.get(("user_u2", "q", 5, False, True)) == ["b"]
+
+    # A public write drops every entry that included public results
+    vs.invalidate_search_cache("public")
+    assert cache.get(("user_u2", "q", 5, True, True)) is None
+    assert cache.get(("user_u2", "q", 5, False, True)) == ["b"]
+
+
+def test_write_during_search_is_not_cached(local_store):
+    key = ("user_u1", "q", 5, False, True)
+    namespaces = ["user_u1"]
+    generation = vs._search_generation(namespaces)
+    vs.invalidate_search_cache("user_u1")  # a write lands while the search is running
+    vs._cache_search_results(key, namespaces, generation, ["stale"])
+    assert vs.get_search_cache().get(key) is None
+
+    vs._cache_search_results(key, namespaces, vs._search_generation(namespaces), ["fresh"])
+    assert vs.get_search_cache().get(key) == ["fresh"]
+
+
+def test_add_document_invalidates_cached_search(local_store):
+    vs.add_document(_document(n_paragraphs=3), "doc", {}, user_id="u1", doc_key="a.pdf")
+    vs.search_grants("p0s0w0", user_id="u1", include_public=False)
+    key = ("user_u1", "p0s0w0", 5, False, True)
+    assert vs.get_search_cache().get(key) is not None
+    vs.add_document(_document(n_paragraphs=2), "doc", {}, user_id="u1", doc_key="b.pdf")
+    assert vs.get_search_cache().get(key) is None
@@ -1,146 +1,854 @@
 import streamlit as st
 from openai import OpenAI
-from pinecone import Pinecone, ServerlessSpec
 import tiktoken
+import hashlib
+import json
+import re
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from typing import Optional
+import numpy as np
+from embedding_cache import EmbeddingCache
+from embedding_providers import EmbeddingProvider, OpenAIEmbeddings, make_provider, normalize_spec
+from local_index import LocalIndex
+from ttl_cache import TTLCache
+from ingest_pipeline import IngestCheckpoint, run_pipeline, with_retry
+from doc_manifest import ManifestStore, chunk_ids_for
+from chunk_store import ChunkStore
+from lexical_index import BM25Index, build_public_index, grant_data_documents, reciprocal_rank_fusion
 
 # =========================
-# 1. Load API Keys from secrets.toml
+# 1. Settings
 # =========================
-OPENAI_API_KEY = st.secrets["OPENAI_API_KEY"]
-PINECONE_API_KEY = st.secrets["PINECONE_API_KEY"]
+INDEX_NAME = "optra-grant-index"
+EMBEDDING_MODEL = "text-embedding-3-small"
+NATIVE_EMBEDDING_DIM = 1536  # full output size of text-embedding-3-small
+EMBEDDING_DIM = 1536  # default; set EMBEDDING_DIM in secrets to shorten (e.g. 256 / 512)
+
+# Embedding provider per namespace: "openai" | "hashing" | "sentence-transformers".
+# EMBEDDING_PROVIDERS in secrets maps "default", "public", "user" (every user_* namespace)
+# or an exact namespace to a provider name or a table, e.g.
+#   [EMBEDDING_PROVIDERS.public]
+#   provider = "sentence-transformers"
+#   threads = 2
+DEFAULT_EMBEDDING_PROVIDER = "openai"
+
+# Embedding requests are batched; a batch closes at whichever limit is hit first
+EMBED_BATCH_SIZE = 100            # inputs per embeddings request
+EMBED_BATCH_MAX_TOKENS = 100_000  # well under the per-request token cap
+
+# Ingestion pipeline: concurrent embed batches feeding paged upserts, resumable via checkpoints
+INGEST_EMBED_WORKERS = 2
+INGEST_UPSERT_WORKERS = 2
+INGEST_CHECKPOINT_DIR = ".optra_cache/ingest_checkpoints"
+DELETE_BATCH_SIZE = 1000  # Pinecone's per-request cap on ids for delete
+FETCH_BATCH_SIZE = 100
+
+# Retention for rated AI answers stored in user namespaces
+AI_RESPONSE_PREFIX = "airesp_"
+AI_RESPONSE_MAX_AGE_DAYS = 180
+AI_RESPONSE_MAX_PER_USER = 500
+AI_RESPONSE_DUPLICATE_SIMILARITY = 0.97  # cosine at/above which two answers are merged
+
+# Per-document chunk manifests for incremental re-indexing
+MANIFEST_PATH = ".optra_cache/manifests.sqlite"
+
+# Chunk text keyed by vector ID (vectors themselves carry metadata only)
+CHUNK_STORE_DIR = ".optra_cache/chunks"
+
+# Local content-addressed embedding cache (model + normalised text -> vector)
+EMBEDDING_CACHE_PATH = ".optra_cache/embeddings.sqlite"
+EMBEDDING_CACHE_MAX_ENTRIES = 50_000
+
+# Namespace queries in search_grants run on a small shared pool
+SEARCH_MAX_WORKERS = 4
+
+# search_grants results are cached per (namespace, query, top_k, include_public)
+# and invalidated whenever the namespaces they read from are written to
+SEARCH_CACHE_TTL_SECONDS = 300
+SEARCH_CACHE_MAX_ENTRIES = 1000
+LEXICAL_INDEX_CHECK_SECONDS = 30  # how often BM25 checks the public manifests for outside writes
+
+# Hybrid retrieval: BM25 over the public corpus fused with dense results (RRF)
+GRANTS_DATA_PATH = "data/grants_data.json"
+RRF_K = 60
+
+# Vector backend: "pinecone" (hosted) or "local" (in-process NumPy index, no network)
+DEFAULT_VECTOR_BACKEND = "pinecone"
+LOCAL_INDEX_PATH = ".optra_cache/local_index"
+
+def _secret(name: str, default=None):
+    try:
+        return st.secrets.get(name, default)
+    except Exception:
+        # No secrets.toml (e.g. offline runs with the local backend)
+        return default
 
 # =========================
-# 2. Connect to OpenAI & Pinecone
+# 2. Lazy, process-wide clients
+# Nothing here runs at import time; each resource is built once per process
+# on first use and shared across sessions and reruns.
 # =========================
-client = OpenAI(api_key=OPENAI_API_KEY)
-pc = Pinecone(api_key=PINECONE_API_KEY)
+@st.cache_resource(show_spinner=False)
+def get_openai_client() -> OpenAI:
+    return OpenAI(api_key=st.secrets["OPENAI_API_KEY"])
+
+@st.cache_resource(show_spinner=False)
+def get_pinecone():
+    from pinecone import Pinecone
+    return Pinecone(api_key=st.secrets["PINECONE_API_KEY"])
+
+def get_vector_backend() -> str:
+    return str(_secret("VECTOR_BACKEND", DEFAULT_VECTOR_BACKEND)).lower()
+
+_dim_override = None
+
+def use_embedding_dim(dim):
+    """Override the configured embedding dimension for this process (benchmarks). None restores it."""
+    global _dim_override
+    _dim_override = dim
+
+def _openai_dim() -> int:
+    if _dim_override is not None:
+        return int(_dim_override)
+    return int(_secret("EMBEDDING_DIM", EMBEDDING_DIM))
+
+def _provider_config() -> dict:
+    configured = _secret("EMBEDDING_PROVIDERS", None) or {}
+    return {str(k): v for k, v in dict(configured).items()}
+
+def _provider_spec(namespace: Optional[str]) -> dict:
+    configured = _provider_config()
+    key = "default"
+    if namespace in configured:
+        key = namespace
+    elif namespace and namespace.startswith("user_") and "user" in configured:
+        key = "user"
+    spec = normalize_spec(configured.get(key, DEFAULT_EMBEDDING_PROVIDER))
+    if spec["provider"] == "openai" and "dim" not in spec:
+        spec["dim"] = _openai_dim()
+    return spec
+
+@st.cache_resource(show_spinner=False)
+def _build_provider(spec_json: str) -> EmbeddingProvider:
+    return make_provider(json.loads(spec_json), get_openai_client, EMBEDDING_MODEL, NATIVE_EMBEDDING_DIM)
+
+def get_embedding_provider(namespace: Optional[str] = None) -> EmbeddingProvider:
+    """Provider configured for a namespace (None = the default). Built once per process per config."""
+    return _build_provider(json.dumps(_provider_spec(namespace), sort_keys=True))
+
+def get_embedding_dim(namespace: Optional[str] = None) -> int:
+    return get_embedding_provider(namespace).dimension
+
+def get_index_name(namespace: Optional[str] = None) -> str:
+    """
+    Each vector space needs its own index. OpenAI vectors keep the original names (native
+    size -> INDEX_NAME, shortened -> INDEX_NAME-<dim>); other providers get INDEX_NAME-<provider>.
+    """
+    provider = get_embedding_provider(namespace)
+    if isinstance(provider, OpenAIEmbeddings) and provider.model == EMBEDDING_MODEL:
+        dim = provider.dimension
+        return INDEX_NAME if dim == NATIVE_EMBEDDING_DIM else f"{INDEX_NAME}-{dim}"
+    # Pinecone index names: lowercase alphanumerics and hyphens, at most 45 characters
+    return f"{INDEX_NAME}-{re.sub(r'[^a-z0-9]+', '-', provider.name.lower()).strip('-')}"[:45]
+
+def _configured_namespaces() -> list:
+    """One representative namespace per provider mapping (None = default, "user_" = every user)."""
+    extra = [k for k in _provider_config() if k not in ("default", "user", "public")]
+    return [None, "public", "user_", *extra]
+
+@st.cache_resource(show_spinner=False)
+def _get_backend_index(backend: str, index_name: str, dim: int):
+    if backend == "local":
+        # "optra-grant-index-512" -> LOCAL_INDEX_PATH + "_512"
+        suffix = index_name[len(INDEX_NAME):].replace("-", "_", 1)
+        return LocalIndex(dim, path=LOCAL_INDEX_PATH + suffix)
+    return get_pinecone().Index(index_name)
+
+_index_override = None
+
+def use_index(index):
+    """Route all reads/writes to the given index handle (e.g. a LocalIndex in tests). None restores the default."""
+    global _index_override
+    _index_override = index
+
+def get_index(namespace: Optional[str] = None):
+    """Index holding `namespace`'s vectors (namespaces with different embedding providers live apart)."""
+    if _index_override is not None:
+        return _index_override
+    return _get_backend_index(get_vector_backend(), get_index_name(namespace), get_embedding_dim(namespace))
+
+def _all_indexes() -> list:
+    """[(index_name, namespace, index)] for every distinct index behind the configured namespaces."""
+    seen = {}
+    for namespace in _configured_namespaces():
+        seen.setdefault(get_index_name(namespace), namespace)
+    indexes, handles = [], set()
+    for name, namespace in seen.items():
+        index = get_index(namespace)
+        if id(index) not in handles:
+            handles.add(id(index))
+            indexes.append((name, namespace, index))
+    return indexes
+
+@st.cache_resource(show_spinner=False)
+def get_embedding_cache() -> EmbeddingCache:
+    return EmbeddingCache(EMBEDDING_CACHE_PATH, max_entries=EMBEDDING_CACHE_MAX_ENTRIES)
+
+@st.cache_resource(show_spinner=False)
+def get_search_cache() -> TTLCache:
+    return TTLCache(SEARCH_CACHE_TTL_SECONDS, max_entries=SEARCH_CACHE_MAX_ENTRIES)
+
+@st.cache_resource(show_spinner=False)
+def _get_search_generations() -> dict:
+    """Per-namespace write counters; a search only caches its results if none moved meanwhile."""
+    return {"lock": threading.Lock(), "gen": {}}
+
+@st.cache_resource(show_spinner=False)
+def get_manifest_store() -> ManifestStore:
+    return ManifestStore(MANIFEST_PATH)
+
+@st.cache_resource(show_spinner=False)
+def get_chunk_store() -> ChunkStore:
+    return ChunkStore(CHUNK_STORE_DIR)
+
+def _build_lexical_index() -> BM25Index:
+    """
+    BM25 index over data/grants_data.json plus every public chunk in the chunk store.
+    A grant profile is indexed whole ("grantsdata_<slug>") only until the ingest CLI has
+    chunked it under the same doc_key; after that its chunks replace it, so the same
+    grant text isn't retrieved twice.
+    """
+    bm25 = build_public_index(grants_path=None)
+    store = get_chunk_store()
+    try:
+        grant_docs = grant_data_documents(GRANTS_DATA_PATH)
+    except FileNotFoundError:
+        grant_docs = []
+    ingested = set(get_manifest_store().doc_keys(_manifest_scope("public")))
+    superseded = [doc_id for doc_id, _, _ in grant_docs if doc_id in ingested]
+    if superseded:
+        store.delete("public", superseded)
+    grant_docs = [d for d in grant_docs if d[0] not in ingested]
+    # Grant profiles are retrievable by ID like any other public chunk
+    missing = set(store.missing([doc_id for doc_id, _, _ in grant_docs], "public"))
+    if missing:
+        store.put_many("public", [d for d in grant_docs if d[0] in missing])
+    for vid, text, metadata in store.items("public"):
+        bm25.add(vid, text, metadata)
+    return bm25
+
+@st.cache_resource(show_spinner=False)
+def _lexical_state() -> dict:
+    return {"lock": threading.Lock(), "index": None, "signature": None, "checked_at": 0.0}
+
+def _lexical_signature():
+    return get_manifest_store().signature(_manifest_scope("public"))
+
+def get_lexical_index() -> BM25Index:
+    """
+    The process's BM25 index over the public corpus. Writes made in this process update it
+    in place; every LEXICAL_INDEX_CHECK_SECONDS it is compared with the public manifests and
+    rebuilt if another process (e.g. scripts/ingest_public_corpus.py) changed them, so
+    re-seeded or deleted chunk IDs don't linger until a restart.
+    """
+    state = _lexical_state()
+    now = time.monotonic()
+    with state["lock"]:
+        index = state["index"]
+        if index is not None and now - state["checked_at"] < LEXICAL_INDEX_CHECK_SECONDS:
+            return index
+        state["checked_at"] = now
+        signature = _lexical_signature()
+        if index is not None and signature == state["signature"]:
+            return index
+    # Built outside the lock: searches keep using the previous index meanwhile
+    index = _build_lexical_index()
+    with state["lock"]:
+        state["index"], state["signature"] = index, signature
+    return index
+
+@st.cache_resource(show_spinner=False)
+def _get_search_pool() -> ThreadPoolExecutor:
+    return ThreadPoolExecutor(max_workers=SEARCH_MAX_WORKERS, thread_name_prefix="optra-search")
 
 # =========================
-# 3. Pinecone index settings
+# 3. Explicit bootstrap (run once per deployment, not on import)
 # =========================
-INDEX_NAME = "optra-grant-index"
-EMBEDDING_DIM = 1536  # matches OpenAI text-embedding-3 models
-
-# Create index if it doesn't exist
-if INDEX_NAME not in [idx["name"] for idx in pc.list_indexes()]:
-    pc.create_index(
-        name=INDEX_NAME,
-        dimension=EMBEDDING_DIM,
-        metric="cosine",
-        spec=ServerlessSpec(cloud="aws", region="us-east-1")
-    )
-
-index = pc.Index(INDEX_NAME)
+def bootstrap_index():
+    """Create the Pinecone index for every configured embedding provider. Returns the index names seen."""
+    targets = {}
+    for namespace in _configured_namespaces():
+        targets.setdefault(get_index_name(namespace), get_embedding_dim(namespace))
+    if get_vector_backend() == "local":
+        return [f"local:{name} ({dim}d)" for name, dim in targets.items()]
+    from pinecone import ServerlessSpec
+    pc = get_pinecone()
+    names = [idx["name"] for idx in pc.list_indexes()]
+    for index_name, dim in targets.items():
+        if index_name not in names:
+            pc.create_index(
+                name=index_name,
+                dimension=dim,
+                metric="cosine",
+                spec=ServerlessSpec(cloud="aws", region="us-east-1")
+            )
+            names.append(index_name)
+    return names
 
 # =========================
 # 4. Helper functions
 # =========================
-def embed_text(text: str):
-    """Convert text to embedding using OpenAI."""
-    response = client.embeddings.create(
-        model="text-embedding-3-small",
-        input=text
-    )
-    return response.data[0].embedding
+def _embed_uncached(texts: list[str], provider: Optional[EmbeddingProvider] = None):
+    """Embed several texts in one provider call (one OpenAI request); results keep the input order."""
+    return (provider or get_embedding_provider()).embed(texts)
+
+def embed_texts(texts: list[str], namespace: Optional[str] = None):
+    """Embed several texts with the namespace's provider, serving repeats from the local embedding cache."""
+    if not texts:
+        return []
+    provider = get_embedding_provider(namespace)
+    if not provider.cacheable:
+        return _embed_uncached(texts, provider)
+    vectors = get_embedding_cache().get_many(provider.name, texts)
+    missing = list(dict.fromkeys(t for t, v in zip(texts, vectors) if v is None))
+    if missing:
+        fresh = dict(zip(missing, _embed_uncached(missing, provider)))
+        get_embedding_cache().put_many(provider.name, missing, [fresh[t] for t in missing])
+        vectors = [v if v is not None else fresh[t] for t, v in zip(texts, vectors)]
+    return vectors
+
+def embed_text(text: str, namespace: Optional[str] = None):
+    """Convert text to an embedding with the namespace's provider."""
+    return embed_texts([text], namespace)[0]
+
+def embedding_cache_stats() -> dict:
+    """Hit/miss counters and size of the local embedding cache."""
+    return get_embedding_cache().stats()
+
+def _get_encoder():
+    return tiktoken.get_encoding("cl100k_base")
+
+def _batch_chunks(chunks: list[str], positions: list[int]):
+    """Group chunk positions into batches bounded by EMBED_BATCH_SIZE and EMBED_BATCH_MAX_TOKENS."""
+    enc = _get_encoder()
+    batch, batch_tokens = [], 0
+    for pos in positions:
+        n_tokens = len(enc.encode(chunks[pos]))
+        if batch and (len(batch) >= EMBED_BATCH_SIZE or batch_tokens + n_tokens > EMBED_BATCH_MAX_TOKENS):
+            yield batch, batch_tokens
+            batch, batch_tokens = [], 0
+        batch.append(pos)
+        batch_tokens += n_tokens
+    if batch:
+        yield batch, batch_tokens
+
+_PARAGRAPH_RE = re.compile(r"\n\s*\n")
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+
+
+def _chunk_units(text: str, max_tokens: int):
+    """(text, n_tokens, ends_paragraph) units: sentences, or token windows for run-on sentences."""
+    enc = _get_encoder()
+    for paragraph in _PARAGRAPH_RE.split(text):
+        sentences = [s.strip() for s in _SENTENCE_RE.split(paragraph.strip()) if s.strip()]
+        for i, sentence in enumerate(sentences):
+            tokens = enc.encode(sentence)
+            last = i == len(sentences) - 1
+            for j in range(0, len(tokens), max_tokens):
+                window = tokens[j:j + max_tokens]
+                piece = sentence if len(window) == len(tokens) else enc.decode(window)
+                yield piece, len(window), last and j + max_tokens >= len(tokens)
+
 
 def chunk_text(text: str, max_tokens: int = 500):
-    """Split text into smaller chunks for better retrieval."""
-    enc = tiktoken.get_encoding("cl100k_base")
-    tokens = enc.encode(text)
-    chunks = []
-    for i in range(0, len(tokens), max_tokens):
-        chunk_tokens = tokens[i:i + max_tokens]
-        chunk_text = enc.decode(chunk_tokens)
-        chunks.append(chunk_text)
+    """
+    Split text into chunks of at most max_tokens for retrieval.
+
+    Boundaries are content-defined so that editing one part of a document leaves the
+    other chunks (and their content-hash IDs) unchanged: sentences are packed up to
+    max_tokens, and once a chunk holds half of that it is closed at the next
+    paragraph end or "anchor" sentence (chosen by a hash of the sentence itself).
+    An insertion therefore only changes chunks up to the next such boundary.
+    """
+    min_tokens = max_tokens // 2
+    chunks, parts, size = [], [], 0
+
+    def _emit():
+        chunks.append("".join(f"{p}{chr(10) * 2 if end else ' '}" for p, end in parts).strip())
+        parts.clear()
+
+    for piece, n, ends_paragraph in _chunk_units(text, max_tokens):
+        if parts and size + n > max_tokens:
+            _emit()
+            size = 0
+        parts.append((piece, ends_paragraph))
+        size += n
+        anchor = zlib.crc32(piece.encode("utf-8")) % 8 == 0
+        if size >= min_tokens and (ends_paragraph or anchor):
+            _emit()
+            size = 0
+    if parts:
+        _emit()
     return chunks
 
 # =========================
 # 5. Data Insertion
 # =========================
-def add_document(text: str, doc_id_prefix: str, metadata: dict, user_id: str):
-    """Add a user-specific document (PDF, notes) into Pinecone."""
-    namespace = f"user_{user_id}"
-    chunks = chunk_text(text)
-    vectors = []
-    for idx, chunk in enumerate(chunks):
-        embedding = embed_text(chunk)
-        vectors.append((
-            f"{doc_id_prefix}_chunk_{idx}",
-            embedding,
-            {**metadata, "chunk_index": idx}
-        ))
-    index.upsert(vectors=vectors, namespace=namespace)
-
-def add_public_document(text: str, doc_id_prefix: str, metadata: dict):
-    """Add a shared public document into Pinecone."""
+def invalidate_search_cache(namespace: str):
+    """
+    Drop cached search results that read from `namespace`.
+    A write to "public" affects every cached search that included public results.
+    The namespace's generation is bumped too, so a search already in flight doesn't
+    cache the pre-write results it is about to return.
+    """
+    generations = _get_search_generations()
+    with generations["lock"]:
+        generations["gen"][namespace] = generations["gen"].get(namespace, 0) + 1
+        if namespace == "public":
+            return get_search_cache().invalidate_where(lambda key: key[3])
+        return get_search_cache().invalidate_where(lambda key: key[0] == namespace)
+
+def _search_generation(namespaces: list[str]) -> tuple:
+    generations = _get_search_generations()
+    with generations["lock"]:
+        return tuple(generations["gen"].get(ns, 0) for ns in namespaces)
+
+def _cache_search_results(key: tuple, namespaces: list[str], generation: tuple, results: list):
+    """Cache results read at `generation`, unless a write to one of the namespaces happened since."""
+    generations = _get_search_generations()
+    with generations["lock"]:
+        if tuple(generations["gen"].get(ns, 0) for ns in namespaces) == generation:
+            get_search_cache().set(key, results)
+
+def _manifest_scope(namespace: str) -> str:
+    """Manifests are per backend, index (embedding space) and namespace, so switching either re-ingests."""
+    return f"{get_vector_backend()}:{get_index_name(namespace)}:{namespace}"
+
+def _upsert_chunks(text: str, doc_key: str, metadata: dict, namespace: str):
+    """
+    Incrementally (re-)index a document under a stable doc_key.
+
+    Chunk IDs are content hashes ("<doc_key>_<hash>"), and a per-document manifest records
+    the IDs written last time. Only new or changed chunks are embedded and upserted (through
+    the pipelined, retried, checkpointed ingestion path); chunks that merely moved get their
+    chunk_index metadata updated, and chunks no longer present are deleted.
+    Returns {"batches", "added", "updated", "unchanged", "removed", "chunk_ids"}.
+    """
     chunks = chunk_text(text)
-    vectors = []
-    for idx, chunk in enumerate(chunks):
-        embedding = embed_text(chunk)
-        vectors.append((
-            f"{doc_id_prefix}_chunk_{idx}",
-            embedding,
-            {**metadata, "chunk_index": idx}
-        ))
-    index.upsert(vectors=vectors, namespace="public")
+    chunk_ids = chunk_ids_for(doc_key, chunks)
+    manifests = get_manifest_store()
+    scope = _manifest_scope(namespace)
+    previous = manifests.get(scope, doc_key) or {"chunks": {}, "metadata": None}
+    old_chunks = previous["chunks"]
+    metadata_changed = previous["metadata"] != json.loads(json.dumps(metadata, default=str))
+
+    new_positions = [i for i, cid in enumerate(chunk_ids) if cid not in old_chunks]
+    moved = [
+        i for i, cid in enumerate(chunk_ids)
+        if cid in old_chunks and (old_chunks[cid] != i or metadata_changed)
+    ]
+    current = set(chunk_ids)
+    removed = [cid for cid in old_chunks if cid not in current]
+    index = get_index(namespace)
+
+    checkpoint = IngestCheckpoint.for_document(INGEST_CHECKPOINT_DIR, scope, doc_key, chunks)
+    pending = [i for i in new_positions if i not in checkpoint.done]
+
+    def make_vector(idx: int, embedding):
+        return (chunk_ids[idx], embedding, {**metadata, "chunk_index": idx})
+
+    # Text goes in first so a vector is never retrievable without its chunk text
+    store = get_chunk_store()
+    to_store = set(new_positions)
+    position = {cid: i for i, cid in enumerate(chunk_ids)}
+    to_store.update(position[cid] for cid in store.missing(chunk_ids, namespace))
+    if to_store:
+        store.put_many(namespace, [(chunk_ids[i], chunks[i], {**metadata, "chunk_index": i}) for i in sorted(to_store)])
+
+    batch_stats = []
+    try:
+        if pending:
+            batch_stats = run_pipeline(
+                chunks,
+                _batch_chunks(chunks, pending),
+                embed_fn=lambda texts: embed_texts(texts, namespace),
+                make_vector=make_vector,
+                upsert_fn=lambda page: index.upsert(vectors=page, namespace=namespace),
+                checkpoint=checkpoint,
+                embed_workers=INGEST_EMBED_WORKERS,
+                upsert_workers=INGEST_UPSERT_WORKERS,
+            )
+        for i in moved:
+            with_retry(lambda i=i: index.update(
+                id=chunk_ids[i], set_metadata={**metadata, "chunk_index": i}, namespace=namespace
+            ))
+        for start in range(0, len(removed), DELETE_BATCH_SIZE):
+            page = removed[start:start + DELETE_BATCH_SIZE]
+            with_retry(lambda page=page: index.delete(ids=page, namespace=namespace))
+    finally:
+        invalidate_search_cache(namespace)
+    checkpoint.complete()
+    manifests.put(scope, doc_key, {cid: i for i, cid in enumerate(chunk_ids)}, metadata)
+    if removed:
+        store.delete(namespace, removed)
+
+    if namespace == "public":
+        lexical = get_lexical_index()
+        # A whole-document profile under this doc_key (see get_lexical_index) is superseded by its chunks
+        store.delete(namespace, [doc_key])
+        lexical.remove(doc_key)
+        for cid in removed:
+            lexical.remove(cid)
+        for i in new_positions + moved:
+            lexical.add(chunk_ids[i], chunks[i], {**metadata, "chunk_index": i})
+        # Already applied in place; don't rebuild for this process's own write
+        state = _lexical_state()
+        with state["lock"]:
+            if state["index"] is lexical:
+                state["signature"] = _lexical_signature()
+
+    return {
+        "batches": batch_stats,
+        "added": len(new_positions),
+        "updated": len(moved),
+        "unchanged": len(chunks) - len(new_positions) - len(moved),
+        "removed": len(removed),
+        "chunk_ids": chunk_ids,
+    }
+
+def forget_manifests(namespace: str, doc_key: Optional[str] = None):
+    """
+    Drop the ingest manifest for one document (or the whole namespace) so the next
+    add re-embeds every chunk, e.g. after switching EMBEDDING_MODEL. Vectors are left in place
+    and get overwritten, since chunk IDs don't change.
+    """
+    get_manifest_store().delete(_manifest_scope(namespace), doc_key)
+
+def add_document(text: str, doc_id_prefix: str, metadata: dict, user_id: str, doc_key: Optional[str] = None):
+    """
+    Add a user-specific document (PDF, notes) into Pinecone.
+    Pass a stable doc_key (e.g. the file name) so re-uploads of a revised document only
+    touch the chunks that changed; without it doc_id_prefix is used as the key.
+    """
+    return _upsert_chunks(text, doc_key or doc_id_prefix, metadata, namespace=f"user_{user_id}")
+
+def add_public_document(text: str, doc_id_prefix: str, metadata: dict, doc_key: Optional[str] = None):
+    """Add a shared public document into Pinecone (incremental on doc_key, as add_document)."""
+    return _upsert_chunks(text, doc_key or doc_id_prefix, metadata, namespace="public")
+
+def question_hash_for(question: str) -> str:
+    return hashlib.sha256(" ".join((question or "").lower().split()).encode("utf-8")).hexdigest()[:24]
 
 def add_ai_response(question: str, answer: str, rating: str, user_id: str):
     """Store a rated AI answer for future optimisation."""
     namespace = f"user_{user_id}"
     combined_text = f"Q: {question}\nA: {answer}"
-    embedding = embed_text(combined_text)
+    embedding = embed_text(combined_text, namespace)
+    now = datetime.now()
+    question_hash = question_hash_for(question)
     metadata = {
         "type": "ai_response",
         "rating": rating,
         "question": question,
-        "timestamp": datetime.now().isoformat()
+        "question_hash": question_hash,
+        "timestamp": now.isoformat(),
+        "timestamp_epoch": now.timestamp(),
     }
-    index.upsert(
-        vectors=[(f"airesp_{datetime.now().timestamp()}", embedding, metadata)],
+    # One vector per question: a newer answer to the same question replaces the old one
+    vector_id = f"{AI_RESPONSE_PREFIX}{question_hash}"
+    get_chunk_store().put_many(namespace, [(vector_id, combined_text, metadata)])
+    get_index(namespace).upsert(
+        vectors=[(vector_id, embedding, metadata)],
         namespace=namespace
     )
+    invalidate_search_cache(namespace)
 
 # =========================
 # 6. Retrieval
 # =========================
-def search_grants(query: str, user_id: str, top_k: int = 5, include_public: bool = True):
-    """Search Pinecone for relevant results from user + public data."""
-    query_vector = embed_text(query)
-    
-    # Search user-specific namespace
-    private_results = index.query(
+def _query_namespace(query_vector, top_k: int, namespace: str):
+    return get_index(namespace).query(
         vector=query_vector,
         top_k=top_k,
         include_metadata=True,
-        namespace=f"user_{user_id}"
+        namespace=namespace
     ).matches
 
-    public_results = []
+def _search_namespaces(user_id: Optional[str], include_public: bool) -> list[str]:
+    namespaces = [f"user_{user_id}"] if user_id else []
     if include_public:
-        public_results = index.query(
-            vector=query_vector,
-            top_k=top_k,
-            include_metadata=True,
-            namespace="public"
-        ).matches
+        namespaces.append("public")
+    return namespaces
+
+def _embed_queries(queries: list[str], namespaces: list[str]) -> dict:
+    """{namespace: [vector per query]}, embedding the queries once per distinct provider."""
+    by_provider, out = {}, {}
+    for namespace in namespaces:
+        name = get_embedding_provider(namespace).name
+        if name not in by_provider:
+            by_provider[name] = embed_texts(queries, namespace)
+        out[namespace] = by_provider[name]
+    return out
+
+def _merge_results(query: str, futures: list, namespaces: list[str], top_k: int,
+                   include_public: bool, hybrid: bool) -> list:
+    """
+    Collect namespace query futures (one per namespace, in order) and cut to top_k.
+    Namespaces sharing one embedding provider are merged by score; when they use different
+    providers their cosine scores aren't comparable, so the per-namespace rankings are fused
+    by reciprocal rank fusion instead. BM25 hits are always fused by RRF.
+    """
+    lexical_results = get_lexical_index().search(query, top_k) if include_public and hybrid and query else []
+    per_namespace = [future.result() for future in futures]
+
+    if len({get_embedding_provider(ns).name for ns in namespaces}) > 1:
+        return reciprocal_rank_fusion([*per_namespace, lexical_results], k=RRF_K, top_k=top_k)
 
     # Combine and sort by score
-    combined_results = private_results + public_results
+    combined_results = [match for matches in per_namespace for match in matches]
     combined_results.sort(key=lambda x: x.score, reverse=True)
+    if lexical_results:
+        return reciprocal_rank_fusion([combined_results, lexical_results], k=RRF_K, top_k=top_k)
     return combined_results[:top_k]
 
+def search_grants(query: str, user_id: str, top_k: int = 5, include_public: bool = True,
+                  query_vector=None, hybrid: bool = True):
+    """
+    Search Pinecone for relevant results from user + public data.
+    The namespaces are queried concurrently, each with a query embedded by its own provider;
+    pass query_vector to skip the embed step (it is then used for every namespace).
+    With include_public and hybrid, BM25 hits over the public corpus are fused with the
+    dense results by reciprocal rank fusion, and match scores are the fused RRF scores
+    (as they are when the user and public namespaces use different embedding providers).
+    Results for a query string are cached for SEARCH_CACHE_TTL_SECONDS (until a write
+    to one of the namespaces searched); calls with an explicit query_vector bypass the cache.
+    """
+    cache_key = (f"user_{user_id}", query, top_k, include_public, hybrid)
+    namespaces = _search_namespaces(user_id, include_public)
+    generation = _search_generation(namespaces)
+    if query_vector is None:
+        cached = get_search_cache().get(cache_key)
+        if cached is not None:
+            return list(cached)
+        vectors = {ns: v[0] for ns, v in _embed_queries([query], namespaces).items()}
+        use_cache = True
+    else:
+        vectors = {ns: query_vector for ns in namespaces}
+        use_cache = False
+
+    pool = _get_search_pool()
+    futures = [pool.submit(_query_namespace, vectors[ns], top_k, ns) for ns in namespaces]
+    combined_results = _merge_results(query, futures, namespaces, top_k, include_public, hybrid)
+    if use_cache:
+        _cache_search_results(cache_key, namespaces, generation, combined_results)
+    return list(combined_results)
+
+def search_grants_many(queries: list[str], user_id: str, top_k: int = 5, include_public: bool = True,
+                       hybrid: bool = True, merged_top_k: Optional[int] = None) -> dict:
+    """
+    Run several search_grants queries at once (e.g. one per eligibility facet).
+    Uncached queries are embedded in a single request and every (query, namespace) lookup
+    is issued concurrently. Returns {"per_query": {query: matches}, "merged": matches}, where
+    "merged" de-duplicates matches across queries and ranks them by reciprocal rank fusion.
+    """
+    queries = list(dict.fromkeys(q for q in queries if q and q.strip()))
+    cache = get_search_cache()
+    namespaces = _search_namespaces(user_id, include_public)
+    generation = _search_generation(namespaces)
+    per_query, pending = {}, []
+    for q in queries:
+        cached = cache.get((f"user_{user_id}", q, top_k, include_public, hybrid))
+        if cached is not None:
+            per_query[q] = list(cached)
+        else:
+            pending.append(q)
+
+    if pending:
+        pool = _get_search_pool()
+        vectors = _embed_queries(pending, namespaces)
+        futures = {
+            q: [pool.submit(_query_namespace, vectors[ns][i], top_k, ns) for ns in namespaces]
+            for i, q in enumerate(pending)
+        }
+        for q in pending:
+            results = _merge_results(q, futures[q], namespaces, top_k, include_public, hybrid)
+            _cache_search_results((f"user_{user_id}", q, top_k, include_public, hybrid), namespaces,
+                                  generation, results)
+            per_query[q] = list(results)
+
+    per_query = {q: per_query[q] for q in queries}
+    merged = reciprocal_rank_fusion(per_query.values(), k=RRF_K, top_k=merged_top_k)
+    return {"per_query": per_query, "merged": merged}
+
+def get_pinecone_context(user_id: str, queries: list[str], top_k: int = 5, max_chars: int = 6000) -> str:
+    """Prompt-ready context: text of the merged search_grants_many matches, best first, capped at max_chars."""
+    merged = search_grants_many(queries, user_id, top_k=top_k, merged_top_k=top_k * 2)["merged"]
+    texts = fetch_chunk_texts([m.id for m in merged], user_id=user_id)
+    blocks, used = [], 0
+    for m in merged:
+        text = texts.get(m.id)
+        if not text:
+            continue
+        text = text.strip()[:max_chars - used]
+        if not text:
+            break
+        blocks.append(f"- {text}")
+        used += len(text)
+    return "\n\n".join(blocks)
+
+def fetch_chunk_texts(ids: list[str], user_id: Optional[str] = None, include_public: bool = True) -> dict:
+    """
+    Bulk-fetch stored text for vector IDs returned by search_grants.
+    Looks in the user's namespace first, then public. IDs without stored text are omitted.
+    """
+    store = get_chunk_store()
+    texts = {}
+    namespaces = ([f"user_{user_id}"] if user_id else []) + (["public"] if include_public else [])
+    remaining = list(dict.fromkeys(ids))
+    for namespace in namespaces:
+        if not remaining:
+            break
+        found = store.get_texts(remaining, namespace)
+        texts.update(found)
+        remaining = [vid for vid in remaining if vid not in found]
+    return texts
+
 # =========================
-# 7. Deletion (for bad answers or privacy)
+# 7. Deletion and retention (for bad answers, privacy and namespace growth)
 # =========================
 def delete_user_data(user_id: str):
     """Remove all vectors for a user."""
-    index.delete(delete_all=True, namespace=f"user_{user_id}")
+    namespace = f"user_{user_id}"
+    get_index(namespace).delete(delete_all=True, namespace=namespace)
+    get_manifest_store().delete(_manifest_scope(namespace))
+    get_chunk_store().delete(namespace)
+    invalidate_search_cache(namespace)
+
+def namespace_sizes() -> dict:
+    """{namespace: vector_count} from the stats of every configured index."""
+    sizes = {}
+    for _, _, index in _all_indexes():
+        stats = index.describe_index_stats()
+        namespaces = stats["namespaces"] if isinstance(stats, dict) else stats.namespaces
+        for name, summary in (namespaces or {}).items():
+            count = summary["vector_count"] if isinstance(summary, dict) else summary.vector_count
+            sizes[name] = sizes.get(name, 0) + count
+    return sizes
+
+def _response_epoch(metadata: dict) -> float:
+    if metadata.get("timestamp_epoch") is not None:
+        return float(metadata["timestamp_epoch"])
+    try:
+        return datetime.fromisoformat(metadata.get("timestamp", "")).timestamp()
+    except ValueError:
+        return 0.0
+
+def compact_ai_responses(
+    user_id: str,
+    max_age_days: Optional[float] = AI_RESPONSE_MAX_AGE_DAYS,
+    max_count: Optional[int] = AI_RESPONSE_MAX_PER_USER,
+    duplicate_similarity: Optional[float] = AI_RESPONSE_DUPLICATE_SIMILARITY,
+    dry_run: bool = False,
+) -> dict:
+    """
+    Apply the ai_response retention policy to one user namespace:
+      1. drop answers older than max_age_days,
+      2. keep only the latest answer per question hash,
+      3. merge near-duplicates (cosine >= duplicate_similarity) into the newest one,
+      4. keep at most max_count answers, newest first.
+    Survivors that absorbed duplicates get a "merged_count" metadata field.
+    Returns a report with namespace sizes before and after.
+    """
+    namespace = f"user_{user_id}"
+    index = get_index(namespace)
+    size_before = namespace_sizes().get(namespace, 0)
+
+    ids = [vid for page in index.list(prefix=AI_RESPONSE_PREFIX, namespace=namespace) for vid in page]
+    records = []
+    for start in range(0, len(ids), FETCH_BATCH_SIZE):
+        fetched = index.fetch(ids=ids[start:start + FETCH_BATCH_SIZE], namespace=namespace).vectors
+        for vid, vec in fetched.items():
+            metadata = dict(vec.metadata or {})
+            records.append({"id": vid, "values": vec.values, "metadata": metadata, "epoch": _response_epoch(metadata)})
+    records.sort(key=lambda r: r["epoch"], reverse=True)
+
+    delete_ids, reasons = [], {"expired": 0, "superseded": 0, "merged": 0, "over_limit": 0}
+
+    kept = records
+    if max_age_days is not None:
+        cutoff = time.time() - max_age_days * 86400
+        expired = [r for r in kept if r["epoch"] < cutoff]
+        reasons["expired"] = len(expired)
+        delete_ids += [r["id"] for r in expired]
+        kept = [r for r in kept if r["epoch"] >= cutoff]
+
+    latest, superseded = {}, []
+    for r in kept:
+        qhash = r["metadata"].get("question_hash") or question_hash_for(r["metadata"].get("question", ""))
+        if qhash in latest:
+            superseded.append(r)
+        else:
+            latest[qhash] = r
+    reasons["superseded"] = len(superseded)
+    delete_ids += [r["id"] for r in superseded]
+    kept = list(latest.values())
+
+    merged_into: dict[str, int] = {}
+    if duplicate_similarity is not None and len(kept) > 1:
+        mat = np.asarray([r["values"] for r in kept], dtype=np.float32)
+        mat /= np.maximum(np.linalg.norm(mat, axis=1, keepdims=True), 1e-12)
+        sims = mat @ mat.T
+        survivors = []
+        for i, r in enumerate(kept):  # newest first, so the survivor is the most recent answer
+            twin = next((j for j in survivors if sims[i, j] >= duplicate_similarity), None)
+            if twin is None:
+                survivors.append(i)
+            else:
+                delete_ids.append(r["id"])
+                merged_into[kept[twin]["id"]] = merged_into.get(kept[twin]["id"], 0) + 1 + int(r["metadata"].get("merged_count", 0))
+        reasons["merged"] = len(kept) - len(survivors)
+        kept = [kept[i] for i in survivors]
+
+    if max_count is not None and len(kept) > max_count:
+        over = kept[max_count:]
+        reasons["over_limit"] = len(over)
+        delete_ids += [r["id"] for r in over]
+        kept = kept[:max_count]
+
+    if not dry_run:
+        for r in kept:
+            extra = merged_into.get(r["id"])
+            if extra:
+                with_retry(lambda r=r, extra=extra: index.update(
+                    id=r["id"],
+                    set_metadata={"merged_count": int(r["metadata"].get("merged_count", 0)) + extra},
+                    namespace=namespace,
+                ))
+        for start in range(0, len(delete_ids), DELETE_BATCH_SIZE):
+            page = delete_ids[start:start + DELETE_BATCH_SIZE]
+            with_retry(lambda page=page: index.delete(ids=page, namespace=namespace))
+        if delete_ids:
+            get_chunk_store().delete(namespace, delete_ids)
+            invalidate_search_cache(namespace)
+
+    return {
+        "namespace": namespace,
+        "ai_responses_before": len(records),
+        "ai_responses_after": len(kept),
+        "deleted": reasons,
+        "namespace_size_before": size_before,
+        "namespace_size_after": size_before - (0 if dry_run else len(delete_ids)),
+        "dry_run": dry_run,
+    }
 
 # =========================
-# 8. Test Block
+# 8. Bootstrap / Test Block
 # =========================
 if __name__ == "__main__":
-    st.write("Available indexes:", pc.list_indexes())
+    st.write("Available indexes:", bootstrap_index())
 
 
@@ -0,0 +1,120 @@
+# write_buffer.py
+import atexit
+import threading
+import time
+from collections import deque
+from typing import Callable, Hashable, Optional
+
+from ttl_cache import TTLCache
+
+
+class WriteBehindBuffer:
+    """
+    In-process write-behind queue for fire-and-forget rows (logs, analytics).
+
+    add() never blocks on I/O: it drops rows whose dedupe key was seen within
+    dedupe_seconds, appends the rest and returns. A daemon thread hands batches of
+    up to batch_size rows to flush_fn every flush_interval seconds, or sooner once a
+    batch is full. At most max_pending rows are held; beyond that the oldest are
+    dropped and counted. A failed batch is retried up to max_attempts times on later
+    flushes. Whatever is pending is flushed at interpreter exit.
+    """
+
+    def __init__(
+        self,
+        flush_fn: Callable[[list], None],
+        *,
+        batch_size: int = 100,
+        flush_interval: float = 2.0,
+        max_pending: int = 5000,
+        dedupe_seconds: float = 0.0,
+        max_dedupe_keys: int = 50_000,
+        max_attempts: int = 3,
+        name: str = "write-behind",
+    ):
+        self.flush_fn = flush_fn
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.max_attempts = max_attempts
+        self.name = name
+        self._seen = TTLCache(dedupe_seconds, max_entries=max_dedupe_keys) if dedupe_seconds > 0 else None
+        self._pending: deque = deque()  # (row, attempts)
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = False
+        self._thread: Optional[threading.Thread] = None
+        self.counters = {"queued": 0, "deduped": 0, "written": 0, "dropped": 0, "failed_batches": 0}
+        atexit.register(self.close)
+
+    # ---------- producer side ----------
+    def add(self, row, key: Optional[Hashable] = None) -> bool:
+        """Queue a row. Returns False if it was a duplicate (or the buffer is closed)."""
+        if self._stopped:
+            return False
+        if key is not None and self._seen is not None:
+            if self._seen.get(key) is not None:
+                with self._lock:
+                    self.counters["deduped"] += 1
+                return False
+            self._seen.set(key, True)
+        with self._lock:
+            self._pending.append((row, 0))
+            self.counters["queued"] += 1
+            while len(self._pending) > self.max_pending:
+                self._pending.popleft()
+                self.counters["dropped"] += 1
+            full = len(self._pending) >= self.batch_size
+        self._ensure_thread()
+        if full:
+            self._wake.set()
+        return True
+
+    # ---------- consumer side ----------
+    def flush(self) -> int:
+        """Write everything pending now (on the calling thread). Returns rows written."""
+        written = 0
+        with self._flush_lock:
+            while True:
+                with self._lock:
+                    if not self._pending:
+                        break
+                    batch = [self._pending.popleft() for _ in range(min(self.batch_size, len(self._pending)))]
+                try:
+                    self.flush_fn([row for row, _ in batch])
+                except Exception as e:
+                    print(f"[{self.name}] flush of {len(batch)} rows failed: {e}")
+                    with self._lock:
+                        self.counters["failed_batches"] += 1
+                        retry = [(row, n + 1) for row, n in batch if n + 1 < self.max_attempts]
+                        self.counters["dropped"] += len(batch) - len(retry)
+                        self._pending.extendleft(reversed(retry))
+                    break  # leave the rest for the next tick
+                written += len(batch)
+                with self._lock:
+                    self.counters["written"] += len(batch)
+        return written
+
+    def _run(self):
+        while not self._stopped:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def _ensure_thread(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                    self._thread.start()
+
+    def close(self):
+        """Stop the flusher and write what is left. Safe to call more than once."""
+        self._stopped = True
+        self._wake.set()
+        self.flush()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self.counters, "pending": len(self._pending)}